@@ -3,11 +3,11 @@
 """
 This file includes functions for calculating metrics given a Time of Event (ToE) profile (i.e., ToE's calculated at different times of prediction resulting from running prognostics multiple times, e.g., on playback data). The metrics calculated here are specific to multiple ToE estimates (e.g. alpha-lambda metric)
 """
-from numpy import sign
-from collections import defaultdict
+from numpy import diff, sign
 from typing import Callable, Dict
 
 from ..predictors import ToEPredictionProfile
+from ..uncertain_data.uncertain_data import _relative_accuracy
 
 def alpha_lambda(toe_profile: ToEPredictionProfile, ground_truth: dict, lambda_value: float, alpha: float, beta: float, **kwargs) -> dict: 
     """
@@ -102,11 +102,12 @@ def cumulative_relative_accuracy(toe_profile: ToEPredictionProfile, ground_truth
     Returns:
         dict: Dictionary containing cumulative relative accuracy (value) for each event (key). e.g., {'event1': 12.3, 'event2': 15.1}
     """
-    ra_sums = defaultdict(int)
-    for uncertaindata in toe_profile.values():
-        for event,value in uncertaindata.relative_accuracy(ground_truth).items():
-            ra_sums[event] += value
-    return {event:ra_sum/len(toe_profile) for event, ra_sum in ra_sums.items()}
+    if len(toe_profile) == 0:
+        return {}
+    # Relative accuracy of every prediction at once, from the cached means for each event
+    ras = _relative_accuracy(ground_truth, {event: means for event, (_, means) in toe_profile._event_means().items()})
+    # Summed one prediction at a time, in order (a Python sum), so the result is exactly that of adding up each prediction's relative accuracy. ndarray.sum uses pairwise summation, which can differ in the last digit
+    return {event: sum(ra.tolist())/len(toe_profile) for event, ra in ras.items()}
 
 def monotonicity(toe_profile: ToEPredictionProfile, **kwargs) -> Dict[str, float]:
         """Calculate monotonicty for a prediction profile. 
@@ -126,15 +127,8 @@ def monotonicity(toe_profile: ToEPredictionProfile, **kwargs) -> Dict[str, float
             dict (str, float): Dictionary where keys represent an event and values are float representing its respective monotonicitiy value between [0, 1].
         """
         result = dict()
-        by_event = defaultdict(list)
-        for time,uncertaindata in toe_profile.items():
-            # Collect and organize mean values for each event in the individual prediction v
-            for event,value in uncertaindata.mean.items():
-                by_event[event].append(value - time)
-        # For each event of this prediction v, calculate monotonicity using formula
-        for key,l in by_event.items():
-            mono_sum = []
-            for i in range(len(l)-1): 
-                mono_sum.append(sign(l[i+1] - l[i])) 
-            result[key] = abs(sum(mono_sum) / (len(l)-1))
+        # For each event, calculate monotonicity of the predicted time to event (mean ToE - time of prediction) using formula
+        for key, (times, means) in toe_profile._event_means().items():
+            mono_sum = sign(diff(means - times)).sum()
+            result[key] = abs(mono_sum / (len(means)-1))
         return result
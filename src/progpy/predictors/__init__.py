@@ -2,7 +2,7 @@
 
 from .monte_carlo import MonteCarlo
 from .predictor import Predictor
-from .prediction import Prediction, UnweightedSamplesPrediction, PredictionResults
+from .prediction import Prediction, UnweightedSamplesPrediction, HDF5UnweightedSamplesPrediction, PredictionResults
 from .toe_prediction_profile import ToEPredictionProfile
 from .unscented_transform import UnscentedTransformPredictor
 
@@ -13,4 +13,4 @@ from .unscented_transform import UnscentedTransformPredictor
 UnscentedTransform = UnscentedTransformPredictor
 MonteCarloPredictor = MonteCarlo
 
-__all__ = ['predictor', 'monte_carlo', 'unscented_transform', 'MonteCarlo', 'Predictor', 'Prediction', 'UnweightedSamplesPrediction', 'ToEPredictionProfile', 'UnscentedTransformPredictor', 'UnscentedTransform', 'MonteCarloPredictor']
+__all__ = ['predictor', 'monte_carlo', 'unscented_transform', 'MonteCarlo', 'Predictor', 'Prediction', 'UnweightedSamplesPrediction', 'HDF5UnweightedSamplesPrediction', 'ToEPredictionProfile', 'UnscentedTransformPredictor', 'UnscentedTransform', 'MonteCarloPredictor']
@@ -1,12 +1,13 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration.  All Rights Reserved.
 
 from collections import abc
-from copy import deepcopy
+from functools import partial
+import numpy as np
 from typing import Callable
 from progpy.sim_result import SimResult, LazySimResult
 from progpy.uncertain_data import UnweightedSamples, UncertainData
 
-from .prediction import UnweightedSamplesPrediction, PredictionResults
+from .prediction import UnweightedSamplesPrediction, HDF5UnweightedSamplesPrediction, PredictionResults
 from .predictor import Predictor
 
 
@@ -24,6 +25,12 @@ class MonteCarlo(Predictor):
         Default number of samples to use. If not specified, a default value is used. If state is type UnweightedSamples and n_samples is not provided, the provided unweighted samples will be used directly.
     save_freq : float, optional
         Default frequency at which results are saved (s).
+    storage : str, optional
+        Where sample trajectories are stored. One of:\n
+        * *memory* (default): All samples are kept in memory as :py:class:`progpy.sim_result.SimResult` objects.\n
+        * *h5*: Each sample is written to an HDF5 file as it is completed, and is only read back when requested. Used for very large numbers of samples. Requires h5py.
+    storage_file : str, optional
+        Path of the HDF5 file used when storage is 'h5' (required for 'h5'). The file is created, replacing any existing file. It is owned by the caller, who should delete it once the prediction results are no longer needed.
     """
 
     __DEFAULT_N_SAMPLES = 100 # Default number of samples to use, if none specified and not UncertainData
@@ -31,7 +38,9 @@ class MonteCarlo(Predictor):
     default_parameters = { 
         'n_samples': None,
         'event_strategy': 'all',
-        'constant_noise': False
+        'constant_noise': False,
+        'storage': 'memory',
+        'storage_file': None
     }
 
     def predict(self, state: UncertainData, future_loading_eqn: Callable=None, events=None, **kwargs) -> PredictionResults:
@@ -67,6 +76,10 @@ class MonteCarlo(Predictor):
             Any additional savepoints (s) e.g., [10.1, 22.5]
         constant_noise : bool, optional
             If the same noise should be applied every step. Default: False
+        storage : str, optional
+            Where sample trajectories are stored, 'memory' or 'h5'. Default: 'memory'
+        storage_file : str, optional
+            Path of the HDF5 file used when storage is 'h5'. Required for 'h5'. The caller owns the file, and should delete it once the results are no longer needed
 
         Return
         ----------
@@ -89,12 +102,19 @@ class MonteCarlo(Predictor):
         if future_loading_eqn is None:
             future_loading_eqn = lambda t, x=None: self.model.InputContainer({})
 
-        params = deepcopy(self.parameters)  # copy parameters
+        # Shallow copy - only top-level keys are rebound below, nested values (e.g., save_pts) are never mutated
+        params = self.parameters.copy()
         params.update(kwargs)  # update for specific run
         params['print'] = False
         params['progress'] = False
         # Remove event_strategy from params to not confuse simulate_to method call
         event_strategy = params.pop('event_strategy')
+        storage = params.pop('storage')
+        storage_file = params.pop('storage_file')
+        if storage not in ('memory', 'h5'):
+            raise ValueError(f"Invalid value for `storage`: {storage}. Should be either 'memory' or 'h5'")
+        if storage == 'h5' and storage_file is None:
+            raise ValueError("`storage_file` is required when storage is 'h5'")
 
         if not isinstance(state, UnweightedSamples) and params['n_samples'] is None:
             # if not unweighted samples, some sample number is required, so set to default.
@@ -138,18 +158,27 @@ class MonteCarlo(Predictor):
             or not isinstance(state, UnweightedSamples)):  # Case 2
             state = state.sample(params['n_samples'])
 
-        es_eqn = self.model.event_state
-        tm_eqn = self.model.threshold_met
-        simulate_to_threshold = self.model.simulate_to_threshold
+        if len(events) == 0:
+            # Predict to time - no event bookkeeping needed
+            predict_sample = self.__predict_sample_to_horizon
+        else:
+            predict_sample = partial(self.__predict_sample_to_events, events=events, event_strategy=event_strategy)
 
         time_of_event_all = []
-        last_states = []
+        last_states = {event: [] for event in events}  # Last state for each event, by event
         times_all = []
         inputs_all = []
         states_all = []
         outputs_all = []
         event_states_all = []
 
+        if storage == 'h5':
+            # h5py is imported here to avoid requiring it if not needed
+            try:
+                import h5py
+            except ImportError:
+                raise ImportError("Missing required dependency h5py for storage='h5'. Install with pip3 install progpy[hdf5] or pip3 install h5py")
+
         if params['constant_noise']:
             # Save loads
             process_noise = self.model['process_noise']
@@ -158,118 +187,83 @@ class MonteCarlo(Predictor):
         # Perform prediction
         t0 = params.get('t0', 0)
         HORIZON = params.get('horizon', float('inf'))  # Save the horizon to be used later
-        for x in state:
-            if params['constant_noise']:
-                # Calculate process noise
-                x_noise = self.model.apply_process_noise(x.copy(), 1)
-                x_noise = self.model.StateContainer({key: x_noise[key] - x[key] for key in x.keys()})
-
-                self.model['process_noise'] = x_noise
-                self.model['process_noise_dist'] = 'constant'
-
-            first_output = self.model.output(x)
+        if 'save_freq' in params and not isinstance(params['save_freq'], tuple):
+            # Save relative to the prediction start, for every simulation of every sample
+            params['save_freq'] = (t0, params['save_freq'])
+        # Use underlying samples directly, rather than the UnweightedSamples iterator, which builds a new container for every sample
+        StateContainer = self.model.StateContainer
+        samples = [x if isinstance(x, StateContainer) else StateContainer(x) for x in state.data]
+        if storage == 'h5':
+            h5_file = h5py.File(storage_file, 'w')
+        try:
+            for sample_id, x in enumerate(samples):
+                if params['constant_noise']:
+                    # Calculate process noise
+                    # Note: x is copied because apply_process_noise may update the state in place
+                    x_noise = self.model.apply_process_noise(x.copy(), 1)
+                    # Set as dict - it's converted to a StateContainer when set in parameters
+                    self.model['process_noise'] = {key: x_noise[key] - x[key] for key in x.keys()}
+                    self.model['process_noise_dist'] = 'constant'
+
+                first_output = self.model.output(x)
             
-            time_of_event = {}
-            last_state = {}
-
-            params['t0'] = t0
-            params['x'] = x
-            params['horizon'] = HORIZON  # reset to initial horizon
+                params['t0'] = t0
+                params['x'] = x
+                params['horizon'] = HORIZON  # reset to initial horizon
 
-            if 'save_freq' in params and not isinstance(params['save_freq'], tuple):
-                params['save_freq'] = (params['t0'], params['save_freq'])
-            
-            if len(events) == 0:  # Predict to time
-                (times, inputs, states, outputs, event_states) = simulate_to_threshold(
+                (times, inputs, states, outputs, event_states, time_of_event, last_state) = predict_sample(
                     future_loading_eqn,
                     first_output,
-                    events=[],
-                    **params
-                )
-            else:
-                events_remaining = events.copy()
-
-                times = []
-                inputs = SimResult(_copy=False)
-                states = SimResult(_copy=False)
-                outputs = LazySimResult(fcn=self.model.output, _copy=False)
-                event_states = LazySimResult(fcn=es_eqn, _copy=False)
-
-                # Non-vectorized prediction
-                while len(events_remaining) > 0:  # Still events to predict
-                    # Since horizon is relative to t0 (the simulation starting point),
-                    # we must subtract the difference in current t0 from the initial (i.e., prediction t0)
-                    # each subsequent simulation
-                    params['horizon'] = HORIZON - (params['t0'] - t0)
-                    (t, u, xi, z, es) = simulate_to_threshold(
-                        future_loading_eqn,
-                        first_output,
-                        events=events_remaining,
-                        **params
-                    )
-
-                    # Add results
-                    times.extend(t)
-                    inputs.extend(u)
-                    states.extend(xi)
-                    outputs.extend(z, _copy=False)
-                    event_states.extend(es, _copy=False)
-
-                    # Get which event occurs
-                    t_met = tm_eqn(states[-1])
-                    t_met = {key: t_met[key] for key in events_remaining}  # Only look at remaining keys
-
-                    try:
-                        event = list(t_met.keys())[list(t_met.values()).index(True)]
-                    except ValueError:
-                        # no event has occured - hit horizon
-                        for event in events_remaining:
-                            time_of_event[event] = None
-                            last_state[event] = None
-                        break
-
-                    # An event has occured
-                    time_of_event[event] = times[-1]
-                    if event_strategy == 'all':
-                        events_remaining.remove(event)  # No longer an event to predict to
-                    elif event_strategy in ('first', 'any'):
-                        events_remaining = []
-                    else:
-                        raise ValueError(f"Invalid value for `event_strategy`: {event_strategy}. Should be either 'all' or 'first'")
-
-                    # Remove last state (event)
-                    params['t0'] = times.pop()
-                    inputs.pop()
-                    params['x'] = states.pop()
-                    last_state[event] = params['x'].copy()
-                    outputs.pop()
-                    event_states.pop()
-            
-            # Add to "all" structures
-            if len(times) > len(times_all):  # Keep longest
-                times_all = times
-            inputs_all.append(inputs)
-            states_all.append(states)
-            outputs_all.append(outputs)
-            event_states_all.append(event_states)
-            time_of_event_all.append(time_of_event)
-            last_states.append(last_state)
-
-            # Reset noise
-            if params['constant_noise']:
-                self.model['process_noise'] = process_noise
-                self.model['process_noise_dist'] = process_noise_dist
+                    params)
+
+                # Add to "all" structures
+                if len(times) > len(times_all):  # Keep longest
+                    times_all = times
+                if storage == 'h5':
+                    # Write sample to file, instead of keeping in memory
+                    n_times = len(times)
+                    dataset = MonteCarlo.__h5_dataset(h5_file, 'times', params['n_samples'], n_times)
+                    dataset[sample_id, :n_times] = times
+                    for name, result in (('inputs', inputs), ('states', states), ('outputs', outputs), ('event_states', event_states)):
+                        keys = list(result.data[0].keys()) if n_times > 0 else []
+                        dataset = MonteCarlo.__h5_dataset(h5_file, name, params['n_samples'], n_times, keys)
+                        if n_times > 0:
+                            dataset[sample_id, :n_times, :] = result.to_numpy(list(dataset.attrs['keys']))
+                else:
+                    inputs_all.append(inputs)
+                    states_all.append(states)
+                    outputs_all.append(outputs)
+                    event_states_all.append(event_states)
+                time_of_event_all.append(time_of_event)
+                for event, last_states_event in last_states.items():
+                    last_states_event.append(last_state.get(event))
+
+                # Reset noise
+                if params['constant_noise']:
+                    self.model['process_noise'] = process_noise
+                    self.model['process_noise_dist'] = process_noise_dist
+        finally:
+            if storage == 'h5':
+                # Closed even if a sample raises, so the file isn't left open
+                h5_file.close()
               
-        inputs_all = UnweightedSamplesPrediction(times_all, inputs_all)
-        states_all = UnweightedSamplesPrediction(times_all, states_all)
-        outputs_all = UnweightedSamplesPrediction(times_all, outputs_all)
-        event_states_all = UnweightedSamplesPrediction(times_all, event_states_all)
+        if storage == 'h5':
+            # Samples are read back as the same types as in memory
+            inputs_all = HDF5UnweightedSamplesPrediction(times_all, storage_file, 'inputs', _type=self.model.InputContainer)
+            states_all = HDF5UnweightedSamplesPrediction(times_all, storage_file, 'states', _type=self.model.StateContainer)
+            outputs_all = HDF5UnweightedSamplesPrediction(times_all, storage_file, 'outputs', _type=self.model.OutputContainer)
+            event_states_all = HDF5UnweightedSamplesPrediction(times_all, storage_file, 'event_states')
+        else:
+            inputs_all = UnweightedSamplesPrediction(times_all, inputs_all)
+            states_all = UnweightedSamplesPrediction(times_all, states_all)
+            outputs_all = UnweightedSamplesPrediction(times_all, outputs_all)
+            event_states_all = UnweightedSamplesPrediction(times_all, event_states_all)
         time_of_event = UnweightedSamples(time_of_event_all)
 
         # Transform final states:
         time_of_event.final_state = {
             key: UnweightedSamples(
-                    [sample[key] for sample in last_states],
+                    last_states[key],
                     _type=self.model.StateContainer
                 ) for key in time_of_event.keys()
         }
@@ -282,3 +276,118 @@ class MonteCarlo(Predictor):
             event_states_all,
             time_of_event
         )
+
+    def __predict_sample_to_horizon(self, future_loading_eqn: Callable, first_output, params: dict) -> tuple:
+        """
+        Predict a single sample (params['x']) to the horizon, without any events
+
+        Returns:
+            tuple: times, inputs, states, outputs, event_states, time_of_event, last_state
+        """
+        (times, inputs, states, outputs, event_states) = self.model.simulate_to_threshold(
+            future_loading_eqn,
+            first_output,
+            events=[],
+            **params
+        )
+        return times, inputs, states, outputs, event_states, {}, {}
+
+    def __predict_sample_to_events(self, future_loading_eqn: Callable, first_output, params: dict, events: list, event_strategy: str) -> tuple:
+        """
+        Predict a single sample (params['x']) until `events` are reached (according to event_strategy) or the horizon is reached. Updates params['t0'], params['x'], and params['horizon'] for each simulation
+
+        Returns:
+            tuple: times, inputs, states, outputs, event_states, time_of_event, last_state
+        """
+        tm_eqn = self.model.threshold_met
+        simulate_to_threshold = self.model.simulate_to_threshold
+
+        t0 = params['t0']
+        HORIZON = params['horizon']
+        events_remaining = events.copy()
+        time_of_event = {}
+        last_state = {}
+
+        times = []
+        inputs = []
+        states = []
+
+        # Non-vectorized prediction
+        while len(events_remaining) > 0:  # Still events to predict
+            # Since horizon is relative to t0 (the simulation starting point),
+            # we must subtract the difference in current t0 from the initial (i.e., prediction t0)
+            # each subsequent simulation
+            params['horizon'] = HORIZON - (params['t0'] - t0)
+            (t, u, xi, _, _) = simulate_to_threshold(
+                future_loading_eqn,
+                first_output,
+                events=events_remaining,
+                **params
+            )
+
+            # Add results
+            # The first savepoint of each simulation is the last (event) savepoint of the previous one, so it replaces it.
+            # On the first simulation the slice is empty, so this is a plain extend
+            times[-1:] = t
+            inputs[-1:] = u.data
+            states[-1:] = xi.data
+
+            # Get which event occurs
+            t_met = tm_eqn(states[-1])
+            t_met = {key: t_met[key] for key in events_remaining}  # Only look at remaining keys
+
+            try:
+                event = list(t_met.keys())[list(t_met.values()).index(True)]
+            except ValueError:
+                # no event has occured - hit horizon
+                for event in events_remaining:
+                    time_of_event[event] = None
+                    last_state[event] = None
+                break
+
+            # An event has occured
+            time_of_event[event] = times[-1]
+            if event_strategy == 'all':
+                events_remaining.remove(event)  # No longer an event to predict to
+            elif event_strategy in ('first', 'any'):
+                events_remaining = []
+            else:
+                raise ValueError(f"Invalid value for `event_strategy`: {event_strategy}. Should be either 'all' or 'first'")
+
+            # Continue from last state (event)
+            params['t0'] = times[-1]
+            params['x'] = states[-1]
+            last_state[event] = params['x'].copy()
+        else:
+            # Remove last state (event)
+            times.pop()
+            inputs.pop()
+            states.pop()
+
+        inputs = SimResult(times.copy(), inputs, _copy=False)
+        # Each result gets its own times and states lists, so removing from one doesn't change the others
+        outputs = LazySimResult(self.model.output, times.copy(), states.copy(), _copy=False)
+        event_states = LazySimResult(self.model.event_state, times.copy(), states.copy(), _copy=False)
+        states = SimResult(times.copy(), states, _copy=False)
+        return times, inputs, states, outputs, event_states, time_of_event, last_state
+
+    @staticmethod
+    def __h5_dataset(h5_file, name: str, n_samples: int, n_times: int, keys: list = None):
+        """
+        Get dataset `name` of h5_file, of shape (n_samples, n_times, len(keys)), or (n_samples, n_times) if keys is None. The dataset is created on first access and grown along the time axis as longer samples are written. Savepoints that a sample does not reach are left as NaN.
+        """
+        if name not in h5_file:
+            shape = (n_samples, 0) if keys is None else (n_samples, 0, len(keys))
+            dataset = h5_file.create_dataset(
+                name,
+                shape=shape,
+                maxshape=(n_samples, None) + shape[2:],
+                dtype='f8',
+                fillvalue=np.nan,
+                chunks=True)
+            if keys is not None:
+                dataset.attrs['keys'] = keys
+        dataset = h5_file[name]
+        if n_times > dataset.shape[1]:
+            dataset.resize(n_times, axis=1)
+        return dataset
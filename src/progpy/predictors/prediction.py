@@ -1,10 +1,11 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration. All Rights Reserved.
 
-from collections import UserList, defaultdict, namedtuple
+from collections import abc, defaultdict, namedtuple
 from typing import Dict, List
-from numpy import sign
+from numpy import array, diff, float64, isnan, sign
 from warnings import warn
 
+from ..sim_result import SimResult
 from ..uncertain_data import UnweightedSamples, UncertainData
 
 PredictionResults = namedtuple('PredictionResults', ["times", "inputs", "states", "outputs", "event_states", "time_of_event"])
@@ -21,6 +22,8 @@ class Prediction():
             Data points for each time in times 
     """
 
+    __slots__ = ['times', 'data']  # Optimization
+
     def __init__(self, times : list, data : list):
         self.times = times
         self.data = data
@@ -89,13 +92,11 @@ class Prediction():
         # For each event, calculate monotonicity using formula
         result = {}
         for key,l in by_event.items():
-            mono_sum = []
-            for i in range(len(l)-1): 
-                mono_sum.append(sign(l[i+1] - l[i])) 
-            result[key] = abs(sum(mono_sum) / (len(l)-1))
+            mono_sum = sign(diff(array(l, dtype=float64))).sum()
+            result[key] = abs(mono_sum / (len(l)-1))
         return result
 
-class UnweightedSamplesPrediction(Prediction, UserList):
+class UnweightedSamplesPrediction(Prediction, abc.Sequence):
     """
     Immutable data class for the result of a prediction, where the predictions are stored as UnweightedSamples. Is returned from the predict method of a sample based prediction class (e.g., MonteCarlo). Objects of this class can be iterated and accessed like a list (e.g., prediction[0]), where prediction[n] represents a profile for sample n.
 
@@ -106,6 +107,8 @@ class UnweightedSamplesPrediction(Prediction, UserList):
             Data points where data[n] is a SimResult for sample n
     """
 
+    __slots__ = ['__transformed', '__transform']  # Optimization
+
     def __init__(self, times: list, data: list):
         super(UnweightedSamplesPrediction, self).__init__(times, data)
         self.__transformed = False  # If transform has been calculated
@@ -123,6 +126,15 @@ class UnweightedSamplesPrediction(Prediction, UserList):
     def __str__(self) -> str:
         return "UnweightedSamplesPrediction with {} savepoints".format(len(self.times))
 
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, sample_id):
+        return self.data[sample_id]
+
+    def __iter__(self):
+        return iter(self.data)
+
     @property
     def mean(self) -> list:
         if not self.__transformed:
@@ -142,22 +154,102 @@ class UnweightedSamplesPrediction(Prediction, UserList):
             self.__calculate_tranform()
         return self.__transform[time_index]
 
-    def __not_implemented(self, *args, **kw):
+
+class HDF5UnweightedSamplesPrediction(Prediction):
+    """
+    .. versionadded:: 1.7.0
+
+    Read-only data class for the result of a prediction, where the samples are stored on disk in an HDF5 file instead of in memory. Is returned from the predict method of MonteCarlo when configured with storage='h5'. Data is only read from the file when requested, so memory use is independent of the number of samples. Objects of this class can be iterated and accessed like a list (e.g., prediction[0]), where prediction[n] represents a profile for sample n.
+
+    .. note::
+        h5py must be installed to use this class (e.g., pip3 install h5py)
+
+    Args:
+        times (list[float]):
+            Times for each data point where times[n] corresponds to data[:][n]
+        filename (str):
+            Path of the HDF5 file
+        dataset (str):
+            Name of the dataset within the file. The dataset is of shape (n_samples, n_times, n_keys), with keys stored in the dataset attribute 'keys'. The file also contains the dataset 'times' of shape (n_samples, n_times), with the times for each sample. Savepoints not reached by a sample are NaN
+        _type (type, optional):
+            Type of each sample (e.g., model.StateContainer), built from a dict of its values. Default is dict
+    """
+
+    __slots__ = ['filename', 'dataset', '_type', '__n_samples']  # Optimization
+
+    def __init__(self, times: list, filename: str, dataset: str, _type=dict):
+        self.times = times
+        self.filename = filename
+        self.dataset = dataset
+        self._type = _type  # Type of each sample (e.g., model.StateContainer), built from a dict
+        self.__n_samples = None  # Read from the file on first request
+
+    def __reduce__(self):
+        """
+        reduce is overridden for pickles and copies. Only the location of the data is kept, not the read-only data property. The sample type is not kept, since model containers are local to their model (as for UnweightedSamples)
+        """
+        return (self.__class__, (self.times, self.filename, self.dataset))
+
+    def __open(self):
         """
-        This function is not implemented. Calling this will raise an error. Is is only included to make the class immutable.
+        Open the file for reading. Each bulk read (e.g., mean or iteration) opens the file once
+        """
+        import h5py
+        return h5py.File(self.filename, 'r')
+
+    def __read_sample(self, f, sample_id: int) -> SimResult:
+        dataset = f[self.dataset]
+        keys = list(dataset.attrs['keys'])
+        times = f['times'][sample_id]
+        reached = ~isnan(times)
+        _type = self._type
+        return SimResult(list(times[reached]), [_type(dict(zip(keys, row))) for row in dataset[sample_id][reached]], _copy=False)
+
+    def __read_snapshot(self, f, time_index: int) -> UnweightedSamples:
+        dataset = f[self.dataset]
+        keys = list(dataset.attrs['keys'])
+        times = f['times'][:, time_index]
+        _type = self._type
+        return UnweightedSamples([None if isnan(t) else _type(dict(zip(keys, row))) for t, row in zip(times, dataset[:, time_index])])
+
+    def __str__(self) -> str:
+        return "HDF5UnweightedSamplesPrediction with {} savepoints".format(len(self.times))
+
+    def __len__(self) -> int:
+        if self.__n_samples is None:
+            with self.__open() as f:
+                self.__n_samples = f[self.dataset].shape[0]
+        return self.__n_samples
+
+    def __getitem__(self, sample_id: int) -> SimResult:
+        with self.__open() as f:
+            return self.__read_sample(f, sample_id)
+
+    def __iter__(self):
+        with self.__open() as f:
+            for sample_id in range(f[self.dataset].shape[0]):
+                yield self.__read_sample(f, sample_id)
 
-        Raises:
-            ValueError: 
+    @property
+    def data(self) -> List[SimResult]:
+        """
+        Profile for each sample, where data[n] is a SimResult for sample n. Note: this reads every sample from disk into memory.
+        """
+        return list(self)
+
+    @property
+    def mean(self) -> list:
+        with self.__open() as f:
+            return [self.__read_snapshot(f, i).mean for i in range(len(self.times))]
+
+    def snapshot(self, time_index: int) -> UnweightedSamples:
+        """Get all samples from a specific timestep
+
+        Args:
+            index (int): Timestep (index number from times)
+
+        Returns:
+            UnweightedSamples: Samples for time corresponding to times[timestep]
         """
-        raise ValueError("UnweightedSamplesPrediction is immutable (i.e., read only)")
-
-    append = __not_implemented
-    extend = __not_implemented
-    clear = __not_implemented
-    reverse = __not_implemented
-    remove = __not_implemented
-    insert = __not_implemented
-    pop = __not_implemented
-    __setitem__ = __not_implemented
-    __setslice__ = __not_implemented
-    __delitem__ = __not_implemented
+        with self.__open() as f:
+            return self.__read_snapshot(f, time_index)
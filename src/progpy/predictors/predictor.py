@@ -7,6 +7,9 @@ from typing import Callable
 from progpy.predictors.prediction import PredictionResults
 from ..uncertain_data import UncertainData
 
+# Methods and properties a model must provide to be used with a predictor
+_REQUIRED_MODEL_ATTRIBUTES = ('output', 'next_state', 'inputs', 'outputs', 'states', 'simulate_to_threshold')
+
 
 class Predictor(ABC):
     """
@@ -24,21 +27,15 @@ class Predictor(ABC):
     default_parameters = {}
 
     def __init__(self, model, **kwargs):
-        if not hasattr(model, 'output'):
-            raise NotImplementedError("model must have `output` method")
-        if not hasattr(model, 'next_state'):
-            raise NotImplementedError("model must have `next_state` method")
-        if not hasattr(model, 'inputs'):
-            raise NotImplementedError("model must have `inputs` property")
-        if not hasattr(model, 'outputs'):
-            raise NotImplementedError("model must have `outputs` property")
-        if not hasattr(model, 'states'):
-            raise NotImplementedError("model must have `states` property")
-        if not hasattr(model, 'simulate_to_threshold'):
-            raise NotImplementedError("model must have `simulate_to_threshold` property")
+        missing = [name for name in _REQUIRED_MODEL_ATTRIBUTES if not hasattr(model, name)]
+        if missing:
+            raise NotImplementedError(f"model must have {', '.join(f'`{name}`' for name in missing)}")
         self.model = model
 
-        self.parameters = deepcopy(self.default_parameters)
+        # Only containers need to be copied deeply, everything else can be shared with the default parameters
+        self.parameters = {
+            key: deepcopy(value) if isinstance(value, (dict, list, set)) else value
+            for key, value in self.default_parameters.items()}
         self.parameters.update(kwargs)
 
     @abstractmethod
@@ -1,15 +1,108 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration. All Rights Reserved.
+from bisect import bisect_left, insort
 import matplotlib.pyplot as plt
-from collections import UserDict
+from collections import defaultdict
 from typing import Dict
 import numpy as np
 
 from progpy.uncertain_data import UncertainData 
 
-class ToEPredictionProfile(UserDict):
+class ToEPredictionProfile(dict):
     """
     Data structure for storing the result of multiple predictions, including time of prediction. This data structure can be treated as a dictionary of time of prediction to Time of Event (ToE) prediction. Iteration of this data structure is in order of increasing time of prediction
     """
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._sorted_keys = []  # Times of prediction, kept in increasing order as predictions are added or removed
+        self._means = None  # Cache for _event_means, cleared when predictions are added or removed
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            insort(self._sorted_keys, key)
+        super().__setitem__(key, value)
+        self._means = None
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        del self._sorted_keys[bisect_left(self._sorted_keys, key)]
+        self._means = None
+
+    # The dict methods and operators below bypass __setitem__ and __delitem__, so they are redirected through them to keep the sorted keys in sync
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *args):
+        if key not in self:
+            return super().pop(key, *args)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self):
+        if not self._sorted_keys:
+            raise KeyError('popitem(): profile is empty')
+        key = self._sorted_keys[-1]
+        return key, self.pop(key)
+
+    def clear(self):
+        super().clear()
+        self._sorted_keys.clear()
+        self._means = None
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __or__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+        result = self.copy()
+        result.update(other)
+        return result
+
+    def __ror__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+        result = self.__class__(other)
+        result.update(self)
+        return result
+
+    def copy(self):
+        return self.__class__(self)
+
+    __copy__ = copy
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def _event_means(self) -> Dict[str, tuple]:
+        """
+        Get the mean ToE of each prediction, organized by event. Used by the metrics that only depend on the mean (e.g., monotonicity, cumulative_relative_accuracy), so it is calculated once and cached until a prediction is added or removed.
+
+        Note: The cache is not cleared if a prediction is modified in place
+
+        Returns:
+            dict[str, tuple[np.ndarray, np.ndarray]]: Map of event to (times_of_prediction, means), in order of increasing time of prediction, for the predictions that include that event
+        """
+        if self._means is None:
+            by_event = defaultdict(lambda: ([], []))
+            for time, toe in self.items():
+                for event, value in toe.mean.items():
+                    times, means = by_event[event]
+                    times.append(time)
+                    means.append(value)
+            self._means = {
+                event: (np.array(times, dtype=np.float64), np.array(means, dtype=np.float64))
+                for event, (times, means) in by_event.items()}
+        return self._means
+
     def add_prediction(self, time_of_prediction: float, toe_prediction: UncertainData):
         """Add a single prediction to the profile
 
@@ -21,25 +114,25 @@ class ToEPredictionProfile(UserDict):
 
     # Functions below are defined to ensure that any iteration is in order of increasing time of prediction
     def __iter__(self):
-        return iter(sorted(super(ToEPredictionProfile, self).__iter__()))
+        return iter(self._sorted_keys)
 
     def items(self):
         """
         Get iterators for the items (time_of_prediction, toe_prediction) of the prediction profile
         """
-        return iter((k, self[k]) for k in self)
+        return iter((k, self[k]) for k in self._sorted_keys)
 
     def keys(self):
         """
         Get iterator for the keys (i.e., time_of_prediction) of the prediction profile
         """
-        return sorted(super(ToEPredictionProfile, self).keys())
+        return self._sorted_keys.copy()
 
     def values(self):
         """
         Get iterator for the values (i.e., toe_prediction) of the prediction profile
         """
-        return [self[k] for k in self.keys()]
+        return (self[k] for k in self._sorted_keys)
 
     def alpha_lambda(self, ground_truth: Dict[str, float], lambda_value: float, alpha: float, beta: float, **kwargs) -> Dict[str, bool]:
         """Calculate Alpha lambda metric for the prediction profile
@@ -134,7 +227,7 @@ class ToEPredictionProfile(UserDict):
         from ..metrics import monotonicity
         return monotonicity(self, **kwargs)
     
-    def plot(self, ground_truth: dict = None , alpha: float = None, show: bool = True) -> dict: # use ground truth, alpha if given,
+    def plot(self, ground_truth: dict = None , alpha: float = None, show: bool = True, render: bool = True) -> dict: # use ground truth, alpha if given,
         """Produce an alpha-beta plot depicting the TtE distribution by time of prediction for each event.
 
         Args:
@@ -144,11 +237,15 @@ class ToEPredictionProfile(UserDict):
                 Optional alpha value; none by default and plotted if specified
             show (bool):
                 Optional bool value; specify whether to display generated plots. Default is true
+            render (bool):
+                Optional bool value; if false, no figures are created and the data that would have been plotted is returned instead. Default is true
         
         Returns:
             dict[str, Figure] :
                 Collection of generated matplotlib figures for each event in profile\n
-                e.g., {'event1': Fig, 'event2': Fig}
+                e.g., {'event1': Fig, 'event2': Fig}\n
+                If render is false, the plot data for each event instead, where time_of_prediction[i] and time_to_event[i] are the coordinates of one sample\n
+                e.g., {'event1': {'time_of_prediction': array, 'time_to_event': array, 'ground_truth': 3442}, ...}
         
         Example:
             ::
@@ -157,32 +254,61 @@ class ToEPredictionProfile(UserDict):
                 figs = profile.plot(gt) # Figure with ground truth line
                 figs = profile.plot(gt, alpha = 0.2) # Figure with ground truth line and 20% alpha bounds
                 figs = profile.plot(gt, alpha = 0.2, show=False) # Dont display figure
+                data = profile.plot(gt, render=False) # Only get plot data
         """
-        result_figs = {}
+        # Samples for each event are collected, then plotted in a single scatter call per event
+        xs_per_event = defaultdict(list)
+        ys_per_event = defaultdict(list)
         for t,v in self.items():
-            raw_samples = v.sample(100) # sample distribution (red scatter plot)
-            for key in v.keys():
-                if key not in result_figs:
-                    # Prepare Figure for Plot
-                    fig_window = plt.figure() # Create new figure for this event key
-                    fig_sub = fig_window.subplots()
-                    fig_sub.grid()
-                    fig_sub.set_title(f"{key} Event")
-                    fig_sub.set_xlabel('Time of Prediction (s)') # time to prediction
-                    fig_sub.set_ylabel('Time to Event (s)') # time to event
-                    result_figs[key] = fig_window
-                # Create scatter plot for this event
-                samples = [e[key]-t for e in raw_samples]
-                result_figs[key].get_axes()[0].scatter([t]*len(samples), samples, color='red') # Adding single distribution of estimates
+            # sample distribution (red scatter plot)
+            if hasattr(v, '_sample_array'):
+                # Fast path: Samples as a single array, with columns in the order of keys
+                raw_samples = v._sample_array(100)
+            else:
+                raw_samples = v.sample(100)
+            for j, key in enumerate(v.keys()):
+                # Add single distribution of estimates for this event
+                if isinstance(raw_samples, np.ndarray):
+                    samples = raw_samples[:, j] - t
+                else:
+                    samples = np.array(raw_samples.key(key), dtype=np.float64) - t
+                xs_per_event[key].append(np.full(len(samples), t))
+                ys_per_event[key].append(samples)
+
+        if not render:
+            ground_truth = ground_truth or {}
+            return {
+                key: {
+                    'time_of_prediction': np.concatenate(xs),
+                    'time_to_event': np.concatenate(ys_per_event[key]),
+                    'ground_truth': ground_truth.get(key)}
+                for key, xs in xs_per_event.items()}
+
+        # Prepare a figure for each event in a single pass
+        figs_and_axes = {key: plt.subplots() for key in xs_per_event}
+        result_figs = {key: fig_window for key, (fig_window, _) in figs_and_axes.items()}
+        axes = {key: fig_sub for key, (_, fig_sub) in figs_and_axes.items()}  # Kept so axes aren't looked up for every plot call
+
+        for key, xs in xs_per_event.items():
+            fig_sub = axes[key]
+            fig_sub.grid()
+            fig_sub.set_title(f"{key} Event")
+            fig_sub.set_xlabel('Time of Prediction (s)') # time to prediction
+            fig_sub.set_ylabel('Time to Event (s)') # time to event
+
+            # Create scatter plot for this event
+            fig_sub.scatter(np.concatenate(xs), np.concatenate(ys_per_event[key]), color='red')
 
         if ground_truth: # If ground_truth is specified, add ground_truth to each event plot (green line)
             for key, val in ground_truth.items():
-                gt_x = range(int(val))
-                gt_y = range(int(val), 0, -1)
-                result_figs[key].get_axes()[0].plot(gt_x, gt_y, color='green')
+                n = int(val)
+                # Ground truth line is linear, so a limited number of points is enough to draw it and its alpha bounds
+                gt_x = np.linspace(0, n, min(max(n, 0), 512))
+                gt_y = n - gt_x
+                axes[key].plot(gt_x, gt_y, color='green')
                 if alpha: # if ground_truth and alpha are specified, add alpha bounds (faded green highlight)
-                    result_figs[key].get_axes()[0].fill_between(gt_x, np.array(gt_y)*(1-alpha), np.array(gt_y)*(1+alpha), color='green', alpha=0.2)
-                result_figs[key].get_axes()[0].set_xlim(0, val+1)
+                    axes[key].fill_between(gt_x, gt_y*(1-alpha), gt_y*(1+alpha), color='green', alpha=0.2)
+                axes[key].set_xlim(0, val+1)
 
         if show: # Optionally not display plots and just return plot objects
             plt.show()
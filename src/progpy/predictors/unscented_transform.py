@@ -1,14 +1,33 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration.  All Rights Reserved.
 
 from collections import abc
-from copy import deepcopy
 from filterpy import kalman
-from numpy import diag, array, transpose, isnan
+from numpy import asarray, diag, array, broadcast_to, column_stack, empty, flatnonzero, float64, fromiter, full, nan, transpose, zeros
 from typing import Callable
 
 from .prediction import Prediction, UnweightedSamplesPrediction, PredictionResults
 from .predictor import Predictor
+from progpy.prognostics_model import PrognosticsModel
 from progpy.uncertain_data import MultivariateNormalDist, UncertainData, ScalarData
+from progpy.utils.containers import DictLikeMatrixWrapper
+
+
+def _unscented_transform(sigmas, Wm, Wc):
+    """
+    Unscented transform of sigma points (without added noise). Equivalent to filterpy.kalman.unscented_transform, but weights the residuals directly instead of multiplying by a dense diag(Wc) matrix
+
+    Args:
+        sigmas (np.array): Sigma points, [sigma_pt][dimension]
+        Wm (np.array): Weights for the mean
+        Wc (np.array): Weights for the covariance
+
+    Returns:
+        tuple[np.array, np.array]: mean and covariance
+    """
+    mean = Wm @ sigmas
+    residual = sigmas - mean
+    cov = (residual.T * Wc) @ residual
+    return mean, cov
 
 
 class LazyUTPrediction(Prediction):
@@ -20,35 +39,52 @@ class LazyUTPrediction(Prediction):
         self.__transform = transform_fcn
         self.__ut_fcn = ut_fcn
 
+    def __reduce__(self):
+        return (Prediction, (self.times, self.data))
+
     @property
     def data(self):
-        if self.__data == None:
-            self.__data = []
+        if self.__data is None:
+            data = []  # Built locally and only stored once complete, so a partially calculated result is never visible
+            # Optimizations
+            snapshot = self.__states.snapshot
+            sigma_points = self.__sigma_fcn.sigma_points
+            transform = self.__transform
+            ut_fcn = self.__ut_fcn
+            Wm = self.__sigma_fcn.Wm
+            Wc = self.__sigma_fcn.Wc
+            sigma_pt_tranformed = None  # Buffer for transformed sigma points, allocated once the number of outputs is known
+
             # For each timepoint
             for i in range(len(self.times)):
-                x = self.__states.snapshot(i)
+                x = snapshot(i)
 
                 # Get Sigma points
                 keys = x.keys()
-                mean = [x.mean[key] for key in keys]  # Maintain ordering
+                x_mean = x.mean
+                mean = [x_mean[key] for key in keys]  # Maintain ordering
                 covar = x.cov
-                sigma_pts = self.__sigma_fcn.sigma_points(mean, covar)
-                
-                # Apply Tranformation (e.g., output, event_state)
-                sigma_pt_tranformed = [
-                    self.__transform({key: value for key, value in zip(keys, sigma_pt)})
-                    for sigma_pt in sigma_pts
-                ]
-                # result is [sigma_pt][ -> output/event_state (dict)]
+                sigma_pts = sigma_points(mean, covar)
 
-                transformed_keys = sigma_pt_tranformed[0].keys()
+                # Containers (e.g., StateContainer) can be built from the sigma point array directly, since it is in the order of keys
+                if isinstance(x._type, type) and issubclass(x._type, DictLikeMatrixWrapper):
+                    to_state = x._type
+                else:
+                    to_state = lambda sigma_pt: dict(zip(keys, sigma_pt))
 
-                # Flatten 
-                sigma_pt_tranformed = array([array(list(sigma_pt.values())) for sigma_pt in sigma_pt_tranformed]) # map -> array
+                # Apply Tranformation (e.g., output, event_state)
+                # result is [sigma_pt][ -> output/event_state]
+                for j, sigma_pt in enumerate(sigma_pts):
+                    transformed = transform(to_state(sigma_pt))
+                    if sigma_pt_tranformed is None:
+                        transformed_keys = list(transformed.keys())
+                        sigma_pt_tranformed = empty((len(sigma_pts), len(transformed_keys)), dtype=float64, order='F')  # Fortran order, so each output's column is contiguous for the transform
+                    sigma_pt_tranformed[j] = list(transformed.values())
 
                 # Apply Unscented Transform to form output distribution
-                mean, cov = self.__ut_fcn(sigma_pt_tranformed, self.__sigma_fcn.Wm, self.__sigma_fcn.Wc)
-                self.__data.append(MultivariateNormalDist(transformed_keys, mean, cov))
+                mean, cov = ut_fcn(sigma_pt_tranformed, Wm, Wc)
+                data.append(MultivariateNormalDist(transformed_keys, mean, cov))
+            self.__data = data
 
         return self.__data
 
@@ -100,7 +136,8 @@ class UnscentedTransformPredictor(Predictor):
         super().__init__(model, **kwargs)
 
         self.model = model
-        self.__input = None  # Input at an individual step. Note, this needs to be a member to pass between state_transition and predict
+        # Input at an individual step, as a single element list (i.e., a mutable box). Note, this needs to be a member to pass between state_transition and predict
+        self.__input = current_input = [None]
 
         # setup UKF
         num_states = model.n_states
@@ -115,10 +152,14 @@ class UnscentedTransformPredictor(Predictor):
             z = model.output(x)
             return model.OutputContainer(z)
 
+        # If limits need to be applied, as a single element list. Checked at the start of each predict, since state limits can be set after the predictor is created
+        self.__has_limits = has_limits = [True]
+
         def state_transition(x, dt):
             x = model.StateContainer(x)
-            x = model.next_state(x, self.__input, dt)
-            x = model.apply_limits(x)
+            x = model.next_state(x, current_input[0], dt)
+            if has_limits[0]:
+                x = model.apply_limits(x)
             return array(list(x.values()))
 
         self.sigma_points = kalman.MerweScaledSigmaPoints(num_states, alpha=self.parameters['alpha'], beta=self.parameters['beta'], kappa=self.parameters['kappa'])
@@ -178,7 +219,8 @@ class UnscentedTransformPredictor(Predictor):
         if future_loading_eqn is None:
             future_loading_eqn = lambda t, x=None: self.model.InputContainer({})
 
-        params = deepcopy(self.parameters) # copy parameters
+        # Shallow copy - only top-level keys are rebound below, and save_pts (which is extended) is copied where it is used
+        params = self.parameters.copy()
         params.update(kwargs) # update for specific run
 
         if params['event_strategy'] != 'all':
@@ -207,48 +249,60 @@ class UnscentedTransformPredictor(Predictor):
         if not isinstance(events, list):
             # Change to list because of the limits of jsonify
             events = list(events)
+        if len(events) == 0:
+            # The ToE distribution is formed from the sigma points' ToE, so there must be at least one event
+            raise ValueError("UnscentedTransformPredictor requires at least one event")
 
         # Optimizations 
         dt = params['dt']
         model = self.model
+        # The default apply_limits does nothing if there are no state limits, so it can be skipped
+        self.__has_limits[0] = bool(getattr(model, 'state_limits', None)) or getattr(type(model), 'apply_limits', None) is not PrognosticsModel.apply_limits
+        current_input = self.__input
         filt = self.filter
         sigma_points = self.sigma_points
         n_points = sigma_points.num_sigmas()
         threshold_met = model.threshold_met
+        vectorized = model.is_vectorized  # If thresholds can be checked for all sigma points in one call
         StateContainer = model.StateContainer
 
         # Update State
-        self.__state_keys = state_keys = state.mean.keys()  # Used to maintain ordering as we strip keys and return
-        filt.x = [x for x in state.mean.values()]
-        filt.P = state.cov
+        state_mean = state.mean  # Calculated once, since it is rebuilt on each access
+        self.__state_keys = state_keys = tuple(state_mean.keys())  # Used to maintain ordering as we strip keys and return
+        filt.x = fromiter(state_mean.values(), dtype=float64, count=len(state_keys))
+        filt.P = asarray(state.cov, dtype=float64)
 
         # Setup first states
         t = params['t0']
         save_pt_index = 0
-        ToE = {key: [float('nan') for i in range(n_points)] for key in events}  # Keep track of final ToE values
-        last_state = {key: [None for i in range(n_points)] for key in events}  # Keep track of final state values
+        n_events = len(events)
+        ToE = full((n_points, n_events), nan)  # Keep track of final ToE values, where ToE[i, j] is for sigma point i and event events[j]
+        reached = zeros((n_points, n_events), dtype=bool)  # If each sigma point has reached each event
+        last_state = empty((n_events, n_points, len(state_keys)), dtype=float64)  # Keep track of final state values, where last_state[j, i] is only set once reached[i, j]
 
         times = []
         inputs = []
         states = []
         save_freq = params['save_freq']
         next_save = t + save_freq
-        save_pts = params['save_pts']
+        save_pts = list(params['save_pts'])
         save_pts.append(1e99)  # Add last endpoint
         def update_all():
             times.append(t)
-            inputs.append(deepcopy(self.__input))  # Avoid optimization where u is not copied
-            x_dict = MultivariateNormalDist(self.__state_keys, filt.x, filt.P, _type = self.model.StateContainer)
+            u = current_input[0]
+            inputs.append(u.copy() if u is not None else None)  # Avoid optimization where u is not copied. Note: Containers copy their underlying array
+            x_dict = MultivariateNormalDist(state_keys, filt.x, filt.P, _type = StateContainer)
             states.append(x_dict)  # Avoid optimization where x is not copied
 
         # Simulation
-        self.__input = future_loading_eqn(t, state.mean)
+        current_input[0] = future_loading_eqn(t, state_mean)
         update_all()  # First State
         while t < params['horizon']:
             # Iterate through time
             t += dt
-            mean_state = StateContainer({key: x for (key, x) in zip(state_keys, filt.x)})
-            self.__input = future_loading_eqn(t, mean_state)
+            # filt.x is in the order of state_keys (i.e., model.states, since state.mean is a StateContainer), so the container is built from a copy of it directly
+            mean_state = StateContainer(array(filt.x, dtype=float64))
+            current_input[0] = future_loading_eqn(t, mean_state)
             filt.predict(dt=dt)
 
             # Record States
@@ -261,48 +315,53 @@ class UnscentedTransformPredictor(Predictor):
             
             # Check that any sigma point has hit event
             points = sigma_points.sigma_points(filt.x, filt.P)
-            all_failed = True
-            for i, point in zip(range(n_points), points):
-                # x = StateContainer({key: x for (key, x) in zip(state_keys, point)})
-                x = StateContainer(point)
-                t_met = threshold_met(x)
-
-                # Check Thresholds
-                for key in events:
-                    if t_met[key]:
-                        if isnan(ToE[key][i]):
-                            # First time event has been reached
-                            ToE[key][i] = t
-                            last_state[key][i] = x.copy()
-                    else:
-                        all_failed = False  # This event for this sigma point hasn't been met yet
+            if vectorized:
+                # Check thresholds for all sigma points at once
+                t_met = threshold_met(StateContainer(transpose(points)))
+                met = column_stack([broadcast_to(t_met[key], (n_points,)) for key in events])
+                newly_reached = met & ~reached  # First time event has been reached
+                reached |= newly_reached
+                ToE[newly_reached] = t
+                for j in range(n_events):
+                    last_state[j, newly_reached[:, j]] = points[newly_reached[:, j]]
+            else:
+                # Only sigma points that haven't reached every event need to be checked
+                for i in flatnonzero(~reached.all(axis=1)):
+                    point = points[i]
+                    x = StateContainer(point)
+                    t_met = threshold_met(x)
+
+                    # Check Thresholds
+                    newly_reached = fromiter((t_met[key] for key in events), dtype=bool, count=n_events) & ~reached[i]  # First time event has been reached
+                    if newly_reached.any():
+                        reached[i] |= newly_reached
+                        ToE[i, newly_reached] = t
+                        last_state[newly_reached, i] = point
+            all_failed = reached.all()
             if all_failed:
                 # If all events have been reched for every sigma point
                 break
         
         # Prepare Results
-        pts = array([[e for e in ToE[key]] for key in ToE.keys()])
-        pts = transpose(pts)
-        mean, cov = kalman.unscented_transform(pts, sigma_points.Wm, sigma_points.Wc)
+        mean, cov = _unscented_transform(ToE, sigma_points.Wm, sigma_points.Wc)
 
         # Transform final state into {event_name: MultivariateNormalDist}
         final_state = {}
-        for event_key in last_state.keys():
-            if any([last_state_i is None for last_state_i in last_state[event_key]]):
+        for j, event_key in enumerate(events):
+            if not reached[:, j].all():
                 # If any sigma point has not met the event threshold
                 final_state[event_key] = None
                 continue
-            last_state_pts = array([[last_state_i[state_key] for state_key in state_keys] for last_state_i in last_state[event_key]])
-            # last_state_pts = transpose(last_state_pts)
-            last_state_mean, last_state_cov = kalman.unscented_transform(last_state_pts, sigma_points.Wm, sigma_points.Wc)
-            final_state[event_key] = MultivariateNormalDist(state_keys, last_state_mean, last_state_cov, _type = self.model.StateContainer)
+            # last_state[j] is already [sigma_pt][state], in the order of state_keys
+            last_state_mean, last_state_cov = _unscented_transform(last_state[j], sigma_points.Wm, sigma_points.Wc)
+            final_state[event_key] = MultivariateNormalDist(state_keys, last_state_mean, last_state_cov, _type = StateContainer)
 
         # At this point only time of event, inputs, and state are calculated 
         inputs_prediction = UnweightedSamplesPrediction(times, [inputs])
         state_prediction = Prediction(times, states)
-        output_prediction = LazyUTPrediction(state_prediction, sigma_points, kalman.unscented_transform, model.output)
-        event_state_prediction = LazyUTPrediction(state_prediction, sigma_points, kalman.unscented_transform, model.event_state)
-        time_of_event = MultivariateNormalDist(ToE.keys(), mean, cov)
+        output_prediction = LazyUTPrediction(state_prediction, sigma_points, _unscented_transform, model.output)
+        event_state_prediction = LazyUTPrediction(state_prediction, sigma_points, _unscented_transform, model.event_state)
+        time_of_event = MultivariateNormalDist(events, mean, cov)
         time_of_event.final_state = final_state
         return PredictionResults(
             times, 
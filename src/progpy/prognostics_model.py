@@ -1139,8 +1139,8 @@ class PrognosticsModel(ABC):
             saved_outputs = LazySimResult(self.__output, saved_times, saved_states) 
             saved_event_states = LazySimResult(self.event_state, saved_times, saved_states)
         else:
-            saved_outputs = SimResult(saved_times, saved_outputs, _copy=False)
-            saved_event_states = SimResult(saved_times, saved_event_states, _copy=False)
+            saved_outputs = SimResult(saved_times.copy(), saved_outputs, _copy=False)
+            saved_event_states = SimResult(saved_times.copy(), saved_event_states, _copy=False)
 
         if 'integration_method' in config:
             # Reset integration method
@@ -1148,8 +1148,8 @@ class PrognosticsModel(ABC):
         
         return self.SimulationResults(
             saved_times, 
-            SimResult(saved_times, saved_inputs, _copy=False), 
-            SimResult(saved_times, saved_states, _copy=False), 
+            SimResult(saved_times.copy(), saved_inputs, _copy=False), 
+            SimResult(saved_times.copy(), saved_states, _copy=False), 
             saved_outputs, 
             saved_event_states
         )
@@ -11,6 +11,57 @@ from progpy.visualize import plot_timeseries
 from typing import Dict, List
 
 
+# Value types that can be copied without deepcopy (immutable values, or arrays of them)
+_COPY_VALUE_TYPES = (int, float, complex, bool, str, np.number, np.bool_, np.ndarray, type(None))
+
+
+def _copy_data(data: list) -> list:
+    """
+    Copy a list of data points (e.g., for a SimResult). Equivalent to deepcopy for containers and dicts of numbers or arrays, without deepcopy's generic traversal. Anything else is deep copied.
+    """
+    result = []
+    for d in data:
+        if isinstance(d, DictLikeMatrixWrapper):
+            result.append(d.copy())
+        elif type(d) is dict and all(isinstance(value, _COPY_VALUE_TYPES) for value in d.values()):
+            result.append({key: value.copy() if isinstance(value, np.ndarray) else value for key, value in d.items()})
+        else:
+            result.append(deepcopy(d))
+    return result
+
+
+def _same_keys(data: list) -> bool:
+    """
+    If every data point has the same keys as the first (in any order)
+    """
+    keys = data[0].keys()
+    return all(d.keys() == keys for d in data)
+
+
+def _pack_containers(data: list):
+    """
+    Move the values of a list of DictLikeMatrixWrapper data points (all of the same type and keys) into one contiguous array. Each data point's matrix becomes a view of a column of that array.
+
+    Returns:
+        np.ndarray: Stacked values ([time][key]), or None if the data can't be packed (e.g., dicts, mixed types, or vectorized containers)
+    """
+    first = data[0]
+    if not isinstance(first, DictLikeMatrixWrapper):
+        return None
+    container_type = type(first)
+    keys = first._keys
+    shape = (len(keys), 1)
+    for d in data:
+        if type(d) is not container_type or d._matrix.shape != shape or d._matrix.dtype != np.float64 or not (d._keys is keys or d._keys == keys):
+            return None
+    buffer = np.empty((len(keys), len(data)), dtype=np.float64)
+    for i, d in enumerate(data):
+        buffer[:, i] = d._matrix[:, 0]
+    for i, d in enumerate(data):
+        d._matrix = buffer[:, i:i+1]
+    return buffer.T
+
+
 class SimResult(UserList):
     """
     `SimResult` is a data structure for the results of a simulation, with time. It is returned from the `simulate_to*` methods for :term:`inputs<input>`, :term:`outputs<output>`, :term:`states<state>`, and :term:`event_states<event state>` for the beginning and ending time step of the simulation, plus any save points indicated by the `savepts` and `save_freq` configuration arguments. The class includes methods for analyzing, manipulating, and visualizing the results of the simulation.
@@ -27,12 +78,19 @@ class SimResult(UserList):
         if times is None or data is None:
             self.times = []
             self.data = []
-        else:
+        elif _copy:
             self.times = times.copy()
-            if _copy:
-                self.data = deepcopy(data)
-            else:
-                self.data = data
+            self.data = _copy_data(data)
+        else:
+            # Caller gives up ownership of times and data- they are used without copying, so they must not be shared or modified after
+            self.times = times
+            self.data = data
+
+    def __reduce__(self):
+        """
+        reduce is overridden for pickles. Only times and data are pickled (not the cached frame), and data isn't copied again when unpickled
+        """
+        return (self.__class__, (self.times, self.data, False))
 
     def __getitem__(self, item):
         """
@@ -69,15 +127,19 @@ class SimResult(UserList):
         """
         warn_once('frame will be deprecated after version 1.5 of ProgPy.', DeprecationWarning, stacklevel=2)
         if self._frame is None:
-            if len(self.data) > 0:  #
-                self._frame = pd.concat([
-                    pd.DataFrame(dict(dframe), index=[0]) for dframe in self.data
-                ], ignore_index=True, axis=0)
+            # Frame is built in one call from all the data, instead of one frame per row
+            stacked = self._stacked()
+            if stacked is not None:
+                self._frame = pd.DataFrame(stacked.copy(), columns=list(self.data[0].keys()))
+            elif len(self.data) > 0 and _same_keys(self.data):
+                # Columns are given, so pandas doesn't have to collect them from every row
+                self._frame = pd.DataFrame(self.data, columns=list(self.data[0].keys()))
+            elif len(self.data) > 0:
+                self._frame = pd.DataFrame(self.data)
             else:
                 self._frame = pd.DataFrame()
             if self.times is not None:
-                self._frame.insert(0, "time", self.times)
-                self._frame = self._frame.set_index('time')
+                self._frame.index = pd.Index(self.times, name='time')
             return self._frame
         else:
             return self._frame
@@ -87,35 +149,23 @@ class SimResult(UserList):
         .. versionadded:: 1.5.0
         
         Returns:
-            bool: If the value has been calculated
+            bool: If the frame is empty (i.e., there are no time points). Doesn't require the frame to be built
         """
-        return self._frame.empty
+        return len(self.times) == 0
 
     def __setitem__(self, key, value):
         """
-            in addition to the normal functionality, updates the _frame if it exists
+            in addition to the normal functionality, clears the cached _frame (rebuilt on next access)
         """
         super().__setitem__(key, value)
-        if self._frame is not None:
-            for col in value:
-                self._frame.at[key, col] = value[col]
+        self._clear_cache()
 
     def __delitem__(self, key):
         """
-            in addition to the normal functionality, updates the _frame if it exists
+            in addition to the normal functionality, clears the cached _frame (rebuilt on next access)
         """
         super().__delitem__(key)
-        if self._frame is not None:
-            self._frame = self._frame.drop([key])
-
-    def insert(self, i: int, item) -> None:
-        """
-            in addition to the normal functionality, updates the _frame if it exists
-        """
-        self.insert(i, item)
-        if self._frame is not None:
-            for value in item:
-                self._frame.insert(i, column=[value], value=item[value])
+        self._clear_cache()
 
     @property
     def iloc(self):
@@ -138,7 +188,15 @@ class SimResult(UserList):
         Returns:
             bool: If the two SimResults are equal
         """
-        return self.times == other.times and self.data == other.data
+        if self.times != other.times:
+            return False
+        stacked = self._stacked()
+        if stacked is not None:
+            other_stacked = other._stacked()
+            if other_stacked is not None:
+                # Compare all values at once, instead of container by container
+                return self.data[0].keys() == other.data[0].keys() and np.array_equal(stacked, other_stacked)
+        return self.data == other.data
 
     def __eq__(self, other) -> bool:
         """
@@ -197,8 +255,7 @@ class SimResult(UserList):
             self.data.extend(other.data)
         else:
             raise ValueError(f"ValueError: Argument must be of type {self.__class__}")
-        if self._frame is not None:
-            self._frame = None
+        self._clear_cache()
 
     def pop_by_index(self, index: int = -1) -> dict:
         """Remove and return an element
@@ -210,8 +267,7 @@ class SimResult(UserList):
             dict: Element Removed
         """
         self.times.pop(index)
-        if self._frame is not None:
-            self._frame = self._frame.drop([self._frame.index.values[index]])
+        self._clear_cache()
         return self.data.pop(index)
 
     def pop(self, index: int = -1) -> dict:
@@ -248,7 +304,7 @@ class SimResult(UserList):
         """Clear the SimResult"""
         self.times = []
         self.data = []
-        self._frame = None
+        self._clear_cache()
 
     def time(self, index: int) -> float:
         """Get time for data point at index `index`
@@ -275,12 +331,32 @@ class SimResult(UserList):
             return np.array([[]], dtype=np.float64)
         if len(self.data[0]) == 0:
             return np.array([[] for _ in self.data], dtype=np.float64)
-        if isinstance(self.data[0], DictLikeMatrixWrapper) and keys is None:
-            return np.array([u_i.matrix[:, 0] for u_i in self.data], dtype=np.float64)
+        stacked = self._stacked()
+        if stacked is not None:
+            if keys is None:
+                return stacked.copy()
+            all_keys = self.data[0].keys()
+            return stacked[:, [all_keys.index(key) for key in keys]]
         if keys is None:
             keys = self.data[0].keys()
         return np.array([[u_i[key] for key in keys] for u_i in self.data], dtype=np.float64)
     
+    def _clear_cache(self):
+        """
+        Clear the cached frame. Called whenever the SimResult is modified. Rebuilding the frame on next access is cheaper than patching it with pandas for each change
+        """
+        self._frame = None
+
+    def _stacked(self):
+        """
+        Values of all data points stacked into one array ([time][key]), for data of DictLikeMatrixWrapper containers. None for any other data. Built on each call, since data and its containers can be modified in place
+        """
+        data = self.data
+        if len(data) == 0 or len(data[0]) == 0 or not isinstance(data[0], DictLikeMatrixWrapper):
+            return None
+        # Note: _matrix is used directly to avoid a deprecation warning for every row
+        return np.concatenate([u_i._matrix[:, :1] for u_i in data], axis=1).T.astype(np.float64, copy=False)
+
     def plot(self, **kwargs) -> figure:
         """
         Plot the simresult as a line plot
@@ -323,7 +399,20 @@ class SimResult(UserList):
         Returns:
             float: Value between [0, 1] indicating monotonicity of a given event for the Prediction.
         """
-        # Collect and organize mean values for each event
+        values = self._stacked()
+        if values is None and len(self.data) > 0 and _same_keys(self.data):
+            # Dicts with the same keys: fill one array ([time][key])
+            keys = list(self.data[0].keys())
+            values = np.empty((len(self.data), len(keys)), dtype=np.float64)
+            for i, d in enumerate(self.data):
+                values[i] = [d[key] for key in keys]
+        if values is not None:
+            # All keys at once, from the stacked values ([time][key]). Sign is taken in place, in the buffer from diff
+            steps = np.diff(values, axis=0)
+            mono_sums = np.sign(steps, out=steps).sum(axis=0)
+            return {key: abs(mono_sum / (len(values) - 1)) for key, mono_sum in zip(self.data[0].keys(), mono_sums)}
+
+        # Collect and organize mean values for each event (data points with different keys)
         by_event = defaultdict(list)
         for uncertaindata in self.data:
             for key, value in uncertaindata.items():
@@ -332,9 +421,8 @@ class SimResult(UserList):
         # For each event, calculate monotonicity using formula
         result = {}
         for key, l in by_event.items():
-            mono_sum = 0
-            for i in range(len(l) - 1):
-                mono_sum += np.sign(l[i + 1] - l[i])
+            steps = np.diff(np.array(l, dtype=np.float64))
+            mono_sum = np.sign(steps, out=steps).sum()
             result[key] = abs(mono_sum / (len(l) - 1))
         return result
 
@@ -365,18 +453,20 @@ class LazySimResult(SimResult):  # lgtm [py/missing-equals]
         """
         self.fcn = fcn
         self.__data = None
+        self._matrix_cache = None
         if times is None or states is None:
             self.times = []
             self.states = []
-        else:
+        elif _copy:
             self.times = times.copy()
-            if _copy:
-                self.states = deepcopy(states)
-            else:
-                self.states = states
+            self.states = _copy_data(states)
+        else:
+            # Caller gives up ownership of times and states (see SimResult)
+            self.times = times
+            self.states = states
 
     def __reduce__(self):
-        return (self.__class__.__base__, (self.times, self.data))
+        return (self.__class__.__base__, (self.times, self.data, False))
 
     def is_cached(self) -> bool:
         """
@@ -391,6 +481,7 @@ class LazySimResult(SimResult):  # lgtm [py/missing-equals]
         """
         self.times = []
         self.__data = None
+        self._clear_cache()
         self.states = []
 
     def extend(self, other: "LazySimResult", _copy=True) -> None:
@@ -406,9 +497,10 @@ class LazySimResult(SimResult):  # lgtm [py/missing-equals]
         if (isinstance(other, self.__class__)):
             self.times.extend(other.times)
             if _copy:
-                self.states.extend(deepcopy(other.states))
+                self.states.extend(_copy_data(other.states))
             else:
                 self.states.extend(other.states)
+            self._clear_cache()
             if self.__data is None or not other.is_cached():
                 self.__data = None
             else:
@@ -430,6 +522,7 @@ class LazySimResult(SimResult):  # lgtm [py/missing-equals]
         """
         self.times.pop(index)
         x = self.states.pop(index)
+        self._clear_cache()
         if self.__data is not None:
             return self.__data.pop(index)
         return self.fcn(x)
@@ -457,6 +550,22 @@ class LazySimResult(SimResult):  # lgtm [py/missing-equals]
     def to_simresult(self) -> SimResult:
         return SimResult(self.times, self.data)
 
+    def _clear_cache(self):
+        super()._clear_cache()
+        self._matrix_cache = None
+
+    def _stacked(self):
+        """
+        Stacked values (see SimResult). When the data was calculated, its containers were packed into one buffer, so the stacked values are that buffer (and stay up to date as the containers are modified in place)
+        """
+        data = self.data  # Calculate data (and pack containers) if needed
+        stacked = self._matrix_cache
+        if stacked is not None and len(stacked) == len(data) and all(d._matrix.base is stacked.base for d in data):
+            return stacked
+        # Containers were replaced or resized since they were packed
+        self._matrix_cache = None
+        return super()._stacked()
+
     @property
     def data(self) -> List[dict]:
         """
@@ -466,7 +575,12 @@ class LazySimResult(SimResult):  # lgtm [py/missing-equals]
             array(dict): data
         """
         if self.__data is None:
-            self.__data = [self.fcn(x) for x in self.states]
+            fcn = self.fcn
+            data = [fcn(x) for x in self.states]
+            if len(data) > 0:
+                # Containers share one buffer, which is also the stacked values used by to_numpy, frame, and monotonicity
+                self._matrix_cache = _pack_containers(data)
+            self.__data = data
         return self.__data
 
 
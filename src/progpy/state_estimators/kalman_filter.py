@@ -85,19 +85,13 @@ class KalmanFilter(state_estimator.StateEstimator):
             self.filter.P = self.parameters['Q'] / 10
         elif isinstance(x0, UncertainData):
             x_mean = x0.mean
-            self.filter.x = np.array([[x_mean[key]] for key in model.states])
+            self.filter.x = np.fromiter((x_mean[key] for key in model.states), dtype=np.float64, count=model.n_states).reshape((-1, 1))
 
             # Reorder covariance to be in same order as model.states
-            mapping = {
-                i: list(x0.keys()).index(key)
-                for i, key in enumerate(model.states)}
-            # Set covariance in case it has been calculated
-            cov = x0.cov
+            keys = list(x0.keys())
+            mapping = np.array([keys.index(key) for key in model.states], dtype=np.intp)
             # Set covariance based on mapping
-            mapped_cov = [
-                [cov[mapping[i]][mapping[j]]
-                 for j in range(len(cov))] for i in range(len(cov))]
-            self.filter.P = np.array(mapped_cov)
+            self.filter.P = np.asarray(x0.cov)[np.ix_(mapping, mapping)]
         else:
             raise TypeError(
                 "TypeError: x0 initial state must be of type "
@@ -107,6 +101,18 @@ class KalmanFilter(state_estimator.StateEstimator):
         self.filter.R = self.parameters['R']
         self.filter.F = F
         self.filter.B = B
+        self.__identity = np.eye(model.n_states)
+        self.__scaled = (None, None, None, None, None)  # (dt, filter.F, filter.B, scaled F, scaled B) from the last estimate
+
+        # Keys, in the order used by the filter
+        self.__input_keys = tuple(model.inputs)
+        self.__output_keys = tuple(model.outputs)
+        self.__state_keys = tuple(model.states)
+
+        # Buffers for the input and output arrays passed to the filter, filled in each estimate
+        self.__inputs = np.empty((num_inputs, 1))
+        self.__inputs[-1, 0] = 1  # Constant E term
+        self.__outputs = np.empty((num_measurements, 1))
 
     def estimate(self, t: float, u, z, **kwargs):
         """
@@ -136,39 +142,59 @@ class KalmanFilter(state_estimator.StateEstimator):
         # Ensure dt is not larger than the maximum time step
         dt = min(t - self.t, dt)
 
-        # Create u array, ensuring order of model.inputs. And reshaping to (n,1), n can be 0.
-        inputs = np.array([u[key] for key in self.model.inputs]).reshape((-1,1))
+        model = self.model
 
-        # Add row of ones (to account for constant E term)
-        if np.size(inputs) == 0:
-            inputs = np.array([[1]])
-        else:
-            inputs = np.append(inputs, [[1]], 0)
+        # Fill u array, ensuring order of model.inputs, shape (n+1,1). The last row is always one (to account for constant E term)
+        inputs = self.__inputs
+        for i, key in enumerate(self.__input_keys):
+            inputs[i, 0] = u[key]
 
         # Update equations
         # progpy is dx = Ax + Bu + E
         # kalman_models is x' = Fx + Bu, where x' is the next state
         # Therefore we need to add the diagnol matrix 1 to A to convert
         # And A and B should be multiplied by the time step
-        B = np.multiply(self.filter.B, dt)
-        F = np.multiply(self.filter.F, dt) + np.diag([1]*self.model.n_states)
+        # These only depend on dt, so they are reused while dt (and the filter's F and B) are unchanged
+        last_dt, last_F, last_B, F, B = self.__scaled
+        if dt != last_dt or self.filter.F is not last_F or self.filter.B is not last_B:
+            B = self.filter.B * dt
+            F = self.filter.F * dt + self.__identity
+            self.__scaled = (dt, self.filter.F, self.filter.B, F, B)
 
         # Predict
-        while self.t < t:
-            self.filter.predict(u=inputs, B=B, F=F)
-            self.t += dt
-
-        # Create z array, ensuring order of model.outputs
-        outputs = np.array([z[key] for key in self.model.outputs])
+        # Same as filter.predict(u=inputs, B=B, F=F) for each step, without its argument handling and per-step copies. B @ u is the same for every step
+        filt = self.filter
+        x = filt.x
+        P = filt.P
+        Q = filt.Q
+        alpha_sq = filt._alpha_sq  # filterpy stores alpha squared (alpha is its square root)
+        Bu = B @ inputs
+        F_T = F.T
+        t_current = self.t
+        while t_current < t:
+            x = F @ x + Bu
+            P = alpha_sq * (F @ P @ F_T) + Q
+            t_current += dt
+        filt.x = x
+        filt.P = P
+        filt.x_prior = x.copy()
+        filt.P_prior = P.copy()
+        self.t = t_current
+
+        # Fill z array, ensuring order of model.outputs, shape (n,1)
+        outputs = self.__outputs
+        for i, key in enumerate(self.__output_keys):
+            outputs[i, 0] = z[key]
 
         # Subtract D from outputs
         # This is done because progpy expects the form:
         #   z = Cx + D
         # While kalman expects
         #   z = Cx
-        outputs = outputs - self.model.D
+        # In place, in the buffer (the filter keeps its own copy of z)
+        np.subtract(outputs, model.D, out=outputs)
 
-        self.filter.update(outputs, H=self.model.C)
+        self.filter.update(outputs, H=model.C)
     
     @property
     def x(self) -> MultivariateNormalDist:
@@ -179,4 +205,4 @@ class KalmanFilter(state_estimator.StateEstimator):
         -------
         state = observer.x
         """
-        return MultivariateNormalDist(self.model.states, self.filter.x.ravel(), self.filter.P, _type=self.model.StateContainer)
+        return MultivariateNormalDist(self.__state_keys, self.filter.x.ravel(), self.filter.P, _type=self.model.StateContainer)
@@ -1,10 +1,9 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration.  All Rights Reserved.
 
-from filterpy.monte_carlo import residual_resample
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from numpy import array, empty, take, exp, max, take, float64
-from scipy.stats import norm
 from warnings import warn
+import weakref
 
 from progpy.utils.containers import DictLikeMatrixWrapper
 
@@ -12,6 +11,100 @@ from . import state_estimator
 from ..uncertain_data import UnweightedSamples, ScalarData, UncertainData
 
 
+def systematic_resample(weights) -> np.ndarray:
+    """
+    Systematic resampling: one random offset, then N evenly spaced positions over the cumulative weights. Same result as filterpy.monte_carlo.systematic_resample, but all positions are looked up at once (np.searchsorted) instead of in a Python loop
+
+    Args:
+        weights (array[float]): Normalized particle weights
+
+    Returns:
+        array[int]: Indexes of the resampled particles
+    """
+    n = len(weights)
+    # Positions are computed in place, in one array
+    positions = np.arange(n, dtype=np.float64)
+    positions += np.random.random()
+    positions /= n
+    cumulative_sum = np.cumsum(weights)
+    cumulative_sum[-1] = 1.0  # Avoid round-off errors: ensures every position is in range
+    return np.searchsorted(cumulative_sum, positions, side='right')
+
+
+# Model used by a worker process to propagate particles. Set once, when the worker starts (see _init_worker), so it isn't sent with every chunk
+_worker_model = None
+
+
+def _init_worker(model) -> None:
+    """
+    Initialize a worker process: keep its copy of the model for every chunk it propagates
+    """
+    global _worker_model
+    _worker_model = model
+
+
+def _propagate_worker_particles(states, u, t0, t, dt, measurement_keys, seed):
+    """
+    Propagate a chunk of particles in a worker process, with the model the worker was started with (see _propagate_particles)
+    """
+    return _propagate_particles(_worker_model, states, u, t0, t, dt, measurement_keys, seed=seed)
+
+
+def _propagate_particles(model, states, u, t0, t, dt, measurement_keys, z_predicted=None, seed=None):
+    """
+    Propagate each particle (column of states, [state][particle]) from t0 to t independently, in place, and predict its measurement. Module-level so that chunks of particles can be sent to worker processes
+
+    Args:
+        model (PrognosticsModel): Model used to propagate the particles
+        states (np.ndarray): Particle states ([state][particle]), in the order of model.states
+        u (InputContainer): Inputs
+        t0 (float): Starting time (s)
+        t (float): Time to propagate to (s)
+        dt (float): Maximum timestep (s)
+        measurement_keys (tuple[str]): Keys of the predicted measurements
+        z_predicted (np.ndarray, optional): Buffer for the predicted measurements ([output][particle]). Allocated if not provided
+        seed (int, optional): Seed for the random number generator (i.e., process noise). Used by worker processes, so each chunk gets different noise
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Propagated states ([state][particle]) and predicted measurements ([output][particle])
+    """
+    if seed is not None:
+        np.random.seed(seed)
+    StateContainer = model.StateContainer
+    next_state = model.next_state
+    apply_process_noise = model.apply_process_noise
+    apply_limits = model.apply_limits
+    if z_predicted is None:
+        z_predicted = np.empty((len(measurement_keys), states.shape[1]))
+    # One state container is reused for every particle: each particle's column is copied into its matrix, instead of building a new container per particle
+    x_i = StateContainer(np.empty((states.shape[0], 1)))
+    x_i_matrix = x_i._matrix
+    for i in range(states.shape[1]):
+        t_i = t0  # Used to mark time for each particle
+        x_i._matrix = x_i_matrix  # In case the model replaced it
+        x_i_matrix[:, 0] = states[:, i]
+        x = x_i
+        while t_i < t:
+            dt_i = min(dt, t-t_i)
+            x = next_state(x, u, dt_i) 
+            x = apply_process_noise(x, dt_i)
+            x = apply_limits(x)
+            t_i += dt_i
+        if isinstance(x, StateContainer):
+            states[:, i] = x._matrix[:, 0]
+        else:
+            for j, key in enumerate(model.states):
+                states[j, i] = x[key]
+        z_i = model.output(x)
+        if isinstance(z_i, DictLikeMatrixWrapper):
+            # Measurement keys are the keys of the output container, in the same order
+            z_predicted[:, i] = z_i._matrix[:, 0]
+        else:
+            for j, key in enumerate(measurement_keys):
+                z_predicted[j, i] = z_i[key]
+    return states, z_predicted
+
+
 class ParticleFilter(state_estimator.StateEstimator):
     """
     Estimates state using a Particle Filter (PF) algorithm.
@@ -37,14 +130,20 @@ class ParticleFilter(state_estimator.StateEstimator):
         num_particles (int, optional):
             Number of particles in particle filter
         resample_fcn (function, optional):
-            Resampling function ([weights]) -> [indexes] e.g., filterpy.monte_carlo.residual_resample
+            Resampling function ([weights]) -> [indexes] e.g., filterpy.monte_carlo.residual_resample. Default is systematic_resample
+        n_jobs (int, optional):
+            Number of worker processes used to propagate the particles of a non-vectorized model. Each process propagates a chunk of the particles; resampling stays in the main process. The model and inputs must be picklable. Only worth it for models that are expensive to step. The worker processes are started on the first estimate, each with its own copy of the model, and reused until :py:meth:`close` is called (or the filter is garbage collected). Call :py:meth:`close` after changing the model's parameters, so the workers are started again with the updated model. Default is 1 (no worker processes)
     """
     default_parameters = {
             't0': -1e-99,  # practically 0, but allowing for a 0 first estimate
             'num_particles': None, 
-            'resample_fcn': residual_resample,
+            'resample_fcn': systematic_resample,
+            'n_jobs': 1
         }
 
+    # Worker processes used to propagate particles when n_jobs > 1, as (n_jobs, model, executor, finalizer). Created on first use and reused between estimates
+    __executor = None
+
     def __init__(self, model, x0, **kwargs):
         super().__init__(model, x0, **kwargs)
         
@@ -67,8 +166,8 @@ class ParticleFilter(state_estimator.StateEstimator):
                 # Added to avoid float/int issues
                 self.parameters['num_particles'] = int(self.parameters['num_particles'])
             sample_gen = x0.sample(self.parameters['num_particles'])
-        samples = {k: array(sample_gen.key(k), dtype=float64) for k in x0.keys()}
-        self.particles = model.StateContainer(samples)
+        # Particles are stored as one matrix ([state][particle]), in the order of model.states
+        self.particles = model.StateContainer(sample_gen._key_matrix(model.states))
 
         if 'R' in self.parameters:
             # For backwards compatibility
@@ -76,9 +175,44 @@ class ParticleFilter(state_estimator.StateEstimator):
             self.parameters['measurement_noise'] = self.parameters['R']
         elif 'measurement_noise' not in self.parameters:
             self.parameters['measurement_noise'] = {key: 0.0 for key in model.outputs}
+
+        # Check which output keys are present (i.e., output of measurement function). Calculated once, from the first particle
+        self.__measurement_keys = tuple(self._measure(model.StateContainer(self.particles._matrix[:, :1].copy())).keys())
+
+        # Buffer for the predicted measurement of each particle ([output][particle]), reused between estimates (non-vectorized models)
+        self.__z_predicted = np.empty((len(self.__measurement_keys), self.parameters['num_particles']))
+
+        # Buffer particles are resampled into (non-vectorized models). Swapped with the particle matrix at each resample
+        self.__resampled = None
     
     def __str__(self):
         return "{} State Estimator".format(self.__class__)
+
+    def __getstate__(self) -> dict:
+        # Worker processes can't be pickled or copied. They are started again when needed
+        state = self.__dict__.copy()
+        state.pop('_ParticleFilter__executor', None)
+        return state
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes used to propagate particles (see n_jobs), if any were started. They are started again if estimate is called after close
+        """
+        if self.__executor is not None:
+            self.__executor[3]()  # Shuts the executor down and detaches the finalizer
+            self.__executor = None
+
+    def __get_executor(self, n_jobs: int) -> ProcessPoolExecutor:
+        """
+        Get the worker processes for n_jobs, starting them if they haven't been started yet, or n_jobs or the model changed
+        """
+        if self.__executor is None or self.__executor[0] != n_jobs or self.__executor[1] is not self.model:
+            self.close()
+            executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(self.model,))
+            # Shut the workers down when the filter is garbage collected (or at exit), without relying on __del__
+            finalizer = weakref.finalize(self, executor.shutdown, wait=False)
+            self.__executor = (n_jobs, self.model, executor, finalizer)
+        return self.__executor[2]
         
     def estimate(self, t : float, u, z, dt = None):
         """
@@ -125,8 +259,15 @@ class ParticleFilter(state_estimator.StateEstimator):
         # apply_measurement_noise = self.model.apply_measurement_noise
         noise_params = self.parameters['measurement_noise']
         num_particles = self.parameters['num_particles']
-        # Check which output keys are present (i.e., output of measurement function)
-        measurement_keys = output(self.model.StateContainer({key: particles[key][0] for key in particles.keys()})).keys()
+        n_jobs = min(int(self.parameters['n_jobs']), num_particles)
+
+        # Predicted measurements ([output][particle]) are written to one buffer, reused between estimates, in the order of the measurement keys
+        keys = self.__measurement_keys
+        zPredicted = self.__z_predicted
+        if zPredicted.shape[1] != num_particles:
+            # Number of particles changed
+            zPredicted = np.empty((len(keys), num_particles))
+            self.__z_predicted = zPredicted
 
         if self.model.is_vectorized:
             # Propagate particles state
@@ -137,33 +278,40 @@ class ParticleFilter(state_estimator.StateEstimator):
                 self.t += dt_i
 
             # Get particle measurements
-            zPredicted = output(self.particles)
+            z_all = output(self.particles)
+            if isinstance(z_all, DictLikeMatrixWrapper) and z_all._matrix.shape == zPredicted.shape:
+                # Measurement keys are the keys of the output container, in the same order
+                np.copyto(zPredicted, z_all._matrix)
+            else:
+                for j, key in enumerate(keys):
+                    zPredicted[j] = z_all[key]
         else:
-            # Reserve space (for efficiency)
-            zPredicted = {key: empty(num_particles) for key in measurement_keys}
-            # Propagate and calculate weights
-            for i in range(num_particles):
-                t_i = self.t  # Used to mark time for each particle
-                x = self.model.StateContainer({key: particles[key][i] for key in particles.keys()})
-                while t_i < t:
-                    dt_i = min(dt, t-t_i)
-                    x = next_state(x, u, dt_i) 
-                    x = apply_process_noise(x, dt_i)
-                    x = apply_limits(x)
-                    t_i += dt_i
-                for key in particles.keys():
-                    self.particles[key][i] = x[key]
-                z = output(x)
-                for key in measurement_keys:
-                    zPredicted[key][i] = z[key]
+            # Propagate particles and predict their measurements
+            # Each particle's state is read from and written back to its column of the particles' matrix ([state][particle])
+            states = particles._matrix
+            if n_jobs > 1:
+                # Particles are independent, so chunks of them are propagated in worker processes
+                # Each chunk gets its own seed, so workers do not repeat the same process noise
+                chunks = np.array_split(np.arange(num_particles), n_jobs)
+                seeds = np.random.randint(2**32, size=n_jobs, dtype=np.uint64)
+                executor = self.__get_executor(n_jobs)
+                futures = [
+                    executor.submit(_propagate_worker_particles, states[:, chunk], u, self.t, t, dt, keys, int(seed))
+                    for chunk, seed in zip(chunks, seeds)]
+                for chunk, future in zip(chunks, futures):
+                    states[:, chunk], zPredicted[:, chunk] = future.result()
+            else:
+                _propagate_particles(self.model, states, u, self.t, t, dt, keys, zPredicted)
             self.t = t
 
-        # Calculate pdf values
-        pdfs = array([norm(zPredicted[key], noise_params[key]).logpdf(z[key])
-                      for key in zPredicted.keys()])
-
-        # Calculate log weights
-        log_weights = pdfs.sum(0)
+        # Calculate log weights- sum of the normal log pdfs of the measurement for each output ([output][particle]), computed directly instead of with a scipy distribution per output
+        # The residuals are computed in place, in the predicted measurement array, and squared and summed in one pass (einsum)
+        # The normalizing term of the pdf is the same for every particle, so it is left out- it cancels out when the weights are normalized below
+        residual = zPredicted
+        residual -= np.array([[z[key]] for key in keys], dtype=np.float64)
+        residual /= np.array([[noise_params[key]] for key in keys], dtype=np.float64)
+        log_weights = np.einsum('ij,ij->j', residual, residual)
+        log_weights *= -0.5
 
         # Scale
         # We subtract the max log weights for numerical stability. 
@@ -172,25 +320,29 @@ class ParticleFilter(state_estimator.StateEstimator):
         # this causes problems when trying to sample from the particles. 
         # We shift them up by the max log weight (essentially making the max log weight 0) to help avoid that problem. 
         # When we normalize the weights by dividing by the sum of all the weights, that constant cancels out.
-        max_log_weight = max(log_weights)
-        scaled_weights = log_weights - max_log_weight
-
-        # Convert to weights
-        unnorm_weights = exp(scaled_weights)
-        
-        # Normalize
-        total_weight = sum(unnorm_weights)
-        self.weights = unnorm_weights / total_weight
+        # Scaling, converting to weights, and normalizing are done in place, in the log_weights array
+        weights = log_weights
+        weights -= weights.max()
+        np.exp(weights, out=weights)
+        weights /= weights.sum()
+        self.weights = weights
 
         # Resample indices
         indexes = self.parameters['resample_fcn'](self.weights)
 
-        # Resampled particles
-        samples = [take(self.particles[state], indexes)
-                   for state in self.particles.keys()]
-
-        # Particles as a dictionary
-        self.particles = self.model.StateContainer(array(samples))
+        # Resampled particles, all states at once ([state][particle])
+        if self.model.is_vectorized:
+            # Wrapped without copying
+            self.particles = self.model.StateContainer(np.take(self.particles._matrix, indexes, axis=1))
+        else:
+            # The particle matrix is owned by the filter (particles are propagated in place), so particles are resampled into a second buffer and the two buffers are swapped, instead of allocating a new matrix and container every step
+            states = self.particles._matrix
+            resampled = self.__resampled
+            if resampled is None or resampled.shape != states.shape:
+                resampled = np.empty_like(states)
+            np.take(states, indexes, axis=1, out=resampled, mode='clip')  # Indexes are always in range. 'clip' avoids numpy buffering the output
+            self.particles._matrix = resampled
+            self.__resampled = states
 
     @property
     def x(self) -> UnweightedSamples:
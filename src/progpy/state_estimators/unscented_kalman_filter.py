@@ -1,12 +1,22 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration.  All Rights Reserved.
 
 from filterpy import kalman
-from numpy import diag, array
+from numpy import diag, array, float64, fromiter
 from warnings import warn, catch_warnings, simplefilter
 
 from progpy.state_estimators import state_estimator
+from progpy.utils.containers import DictLikeMatrixWrapper
 from progpy.uncertain_data import MultivariateNormalDist, UncertainData
 
+def _values_array(d):
+    """
+    Values of a container or dict as a 1D array. Container values are read straight from its matrix, without copying
+    """
+    if isinstance(d, DictLikeMatrixWrapper):
+        return d._matrix[:, 0]
+    return array(list(d.values())).ravel()
+
+
 class UnscentedKalmanFilter(state_estimator.StateEstimator):
     """
     An Unscented Kalman Filter (UKF) for state estimation
@@ -53,29 +63,27 @@ class UnscentedKalmanFilter(state_estimator.StateEstimator):
         self.x0 = x0
         # Saving for reduce pickling
 
+        if list(x0.keys()) == list(model.states):
+            # Filter state is in the same order as model.states, so each sigma point is wrapped as a StateContainer directly (copied, so the model can't change the filter's sigma points)
+            def to_state(x):
+                return model.StateContainer(array(x, dtype=float64).reshape((-1, 1)))
+        else:
+            def to_state(x):
+                return model.StateContainer({key: value for (key, value) in zip(x0.keys(), x)})
+
+        # Note: model noise is set to 0 once per estimate (see estimate), not for every sigma point
         def measure(x):
-            # Disable deprecation warnings for internal progpy code.
-            x = model.StateContainer({key: value for (key, value) in zip(x0.keys(), x)})
-            R_err = model.parameters['measurement_noise'].copy()
-            with catch_warnings():
-                simplefilter("ignore", DeprecationWarning)
-                model.parameters['measurement_noise'] = dict.fromkeys(R_err, 0)
-                z = model.output(x)
-                model.parameters['measurement_noise'] = R_err
-                return array(list(z.values())).ravel()
+            x = to_state(x)
+            z = model.output(x)
+            return _values_array(z)
 
         if 'Q' not in self.parameters:
             self.parameters['Q'] = diag([1.0e-3 for _ in x0.keys()])
 
         def state_transition(x, dt):
-            # Disable deprecation warnings for internal progpy code.
-            x = model.StateContainer({key: value for (key, value) in zip(x0.keys(), x)})
-            Q_err = model.parameters['process_noise'].copy()
-            with catch_warnings():
-                simplefilter("ignore", DeprecationWarning)
-                model.parameters['process_noise'] = dict.fromkeys(Q_err, 0)
-                x = model.next_state(x, self.__input, dt)
-                return array(list(x.values())).ravel()
+            x = to_state(x)
+            x = model.next_state(x, self.__input, dt)
+            return _values_array(x)
 
         num_states = len(x0.keys())
         num_measurements = model.n_outputs
@@ -84,11 +92,15 @@ class UnscentedKalmanFilter(state_estimator.StateEstimator):
         
         if isinstance(x0, dict) or isinstance(x0, model.StateContainer):
             warn("Use UncertainData type if estimating filtering with uncertain data.")
-            self.filter.x = array(list(x0.values()))
+            self.filter.x = array(_values_array(x0), dtype=float64)
             self.filter.P = self.parameters['Q'] / 10
+        elif isinstance(x0, MultivariateNormalDist):
+            # Mean is read from the distribution's array, without building a dict. Copied, so the filter does not share it with x0
+            self.filter.x = array(x0.mean_array, dtype=float64)
+            self.filter.P = x0.cov
         elif isinstance(x0, UncertainData):
             x_mean = x0.mean
-            self.filter.x = array(list(x_mean.values()))
+            self.filter.x = fromiter(x_mean.values(), dtype=float64, count=num_states)
             self.filter.P = x0.cov
         else:
             raise TypeError("TypeError: x0 initial state must be of type {{dict, UncertainData}}")
@@ -126,10 +138,22 @@ class UnscentedKalmanFilter(state_estimator.StateEstimator):
         dt = kwargs.get('dt', self.parameters['dt'])
         dt = min(t - self.t, dt)
         self.__input = u
-        while self.t < t:
-            self.filter.predict(dt=dt)
-            self.t += dt
-        self.filter.update(array(list(z.values())))
+
+        # Set model noise to 0 for the whole step (noise is accounted for by the filter, with Q and R)
+        # Disable deprecation warnings for internal progpy code.
+        parameters = self.model.parameters
+        with catch_warnings():
+            simplefilter("ignore", DeprecationWarning)
+            m_noise, parameters['measurement_noise'] = parameters['measurement_noise'], 0
+            p_noise, parameters['process_noise'] = parameters['process_noise'], 0
+            try:
+                while self.t < t:
+                    self.filter.predict(dt=dt)
+                    self.t += dt
+                self.filter.update(_values_array(z))
+            finally:
+                parameters['measurement_noise'] = m_noise
+                parameters['process_noise'] = p_noise
     
     @property
     def x(self) -> MultivariateNormalDist:
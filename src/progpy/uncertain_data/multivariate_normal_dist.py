@@ -1,7 +1,10 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration. All Rights Reserved.
 
-from numpy import array
-from numpy.random import multivariate_normal
+from numbers import Number
+from numpy import allclose, array, ndarray, sqrt
+from numpy.linalg import svd
+from numpy.random import standard_normal
+from warnings import warn
 
 from . import UncertainData, UnweightedSamples
 
@@ -17,8 +20,10 @@ class MultivariateNormalDist(UncertainData):
     """
     def __init__(self, labels, mean: array, covar : array, _type = dict):
         self.__labels = list(labels)
-        self.__mean = array(list(mean))
-        self.__covar = array(list(covar))
+        # Arrays are copied directly. Other iterables (e.g., dict values) are converted to a list first
+        self.__mean = array(mean) if isinstance(mean, ndarray) else array(list(mean))
+        self.__covar = array(covar) if isinstance(covar, ndarray) else array(list(covar))
+        self.__factor = None  # Factor of the covariance used for sampling, calculated on first sample
         super().__init__(_type)
 
     def __reduce__(self):
@@ -28,9 +33,11 @@ class MultivariateNormalDist(UncertainData):
         return isinstance(other, MultivariateNormalDist) and self.keys() == other.keys() and self.mean == other.mean and (self.cov == other.cov).all()
 
     def __add__(self, other: int) -> "UncertainData":
+        if not isinstance(other, Number):
+            raise TypeError(f" unsupported operand type(s) for +: '{type(other)}' and '{type(self.__mean[0])}'")
         if other == 0:
             return self
-        return MultivariateNormalDist(self.__labels, array([i+other for i in self.__mean]), self.__covar)
+        return MultivariateNormalDist(self.__labels, self.__mean + other, self.__covar)
 
     def __radd__(self, other: int) -> "UncertainData":
         return self.__add__(other)
@@ -39,13 +46,15 @@ class MultivariateNormalDist(UncertainData):
         if not isinstance(other, (int, float)):
             raise TypeError(f" unsupported operand type(s) for +: '{type(other)}' and '{type(self.__mean[0])}'")
         if other != 0:
-            self.__mean = array([i+other for i in self.__mean])
+            self.__mean = self.__mean + other
         return self
 
     def __sub__(self, other: int) -> "UncertainData":
+        if not isinstance(other, Number):
+            raise TypeError(f" unsupported operand type(s) for -: '{type(other)}' and '{type(self.__mean[0])}'")
         if other == 0:
             return self
-        return MultivariateNormalDist(self.__labels, array([i-other for i in self.__mean]), self.__covar)
+        return MultivariateNormalDist(self.__labels, self.__mean - other, self.__covar)
 
     def __rsub__(self, other: int) -> "UncertainData":
         return self.__sub__(other)
@@ -54,16 +63,35 @@ class MultivariateNormalDist(UncertainData):
         if not isinstance(other, (int, float)):
             raise TypeError(f" unsupported operand type(s) for -: '{type(other)}' and '{type(self.__mean[0])}'")
         if other != 0:
-            self.__mean = array([i-other for i in self.__mean])
+            self.__mean = self.__mean - other
         return self
 
-    def sample(self, num_samples: int = 1) -> UnweightedSamples:
-        if len(self.__mean) != len(self.__labels):
+    def _sample_array(self, num_samples: int = 1) -> array:
+        """Generate samples as an array, without building a dict per sample
+
+        Args:
+            num_samples (int, optional): Number of samples to generate. Defaults to 1.
+
+        Returns:
+            np.array: Samples of shape (num_samples, len(keys)), with columns in the order of keys()
+        """
+        n = len(self.__mean)
+        if n != len(self.__labels):
             raise Exception("labels must be provided for each value")
-    
-        samples = multivariate_normal(self.__mean, self.__covar, num_samples)
-        samples = [{key: value for (key, value) in zip(self.__labels, x)} for x in samples]
-        return UnweightedSamples(samples, _type = self._type)
+        if self.__factor is None:
+            # Same factorization as numpy.random.multivariate_normal (so samples are the same for the same random state), but only done once
+            if self.__covar.shape != (n, n):
+                raise ValueError("cov must be 2 dimensional and square, with the same length as mean")
+            (_, s, vh) = svd(self.__covar)
+            if not allclose((vh.T * s) @ vh, self.__covar, rtol=1e-8, atol=1e-8):
+                warn("covariance is not symmetric positive-semidefinite.", RuntimeWarning)
+            self.__factor = sqrt(s)[:, None] * vh
+        samples = standard_normal((num_samples, n)) @ self.__factor
+        samples += self.__mean
+        return samples
+
+    def sample(self, num_samples: int = 1) -> UnweightedSamples:
+        return UnweightedSamples._from_matrix(self.__labels, self._sample_array(num_samples), _type = self._type)
 
     def keys(self) -> list:
         return self.__labels
@@ -77,6 +105,13 @@ class MultivariateNormalDist(UncertainData):
     def mean(self) -> dict:
         return self._type({key: value for (key, value) in zip(self.__labels, self.__mean)})
 
+    @property
+    def mean_array(self) -> array:
+        """
+        Mean as an array, in the order of keys(). This is the distribution's own array (not a copy), so it should not be modified
+        """
+        return self.__mean
+
     def __str__(self) -> str:
         return 'MultivariateNormalDist(mean: {}, covar: {})'.format(self.__mean, self.__covar)     
 
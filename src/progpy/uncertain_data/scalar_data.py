@@ -1,7 +1,7 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration. All Rights Reserved.
 
 from typing import Union
-from numpy import array
+from numpy import array, zeros
 
 from . import UncertainData, UnweightedSamples
 
@@ -26,10 +26,7 @@ class ScalarData(UncertainData):
     def __add__(self, other: int) -> "UncertainData":
         if other == 0:
             return self
-        new_state = dict()
-        for k,v in self.__state.items():
-            new_state[k] = v + other
-        return ScalarData(new_state)
+        return ScalarData({k: v + other for k, v in self.__state.items()})
 
     def __radd__(self, other: int) -> "UncertainData":
         return self.__add__(other)
@@ -41,10 +38,7 @@ class ScalarData(UncertainData):
         return self
 
     def __sub__(self, other: int) -> "UncertainData":
-        new_state = dict()
-        for k,v in self.__state.items():
-            new_state[k] = v - other
-        return ScalarData(new_state)
+        return ScalarData({k: v - other for k, v in self.__state.items()})
 
     def __rsub__(self, other: int) -> "UncertainData":
         return self.__sub__(other)
@@ -65,7 +59,8 @@ class ScalarData(UncertainData):
 
     @property
     def cov(self) -> array:
-        return [[0 for _ in range(len(self.__state))] for _ in range(len(self.__state))]
+        # No uncertainty- all zeros
+        return zeros((len(self.__state), len(self.__state)))
 
     def keys(self):
         return self.__state.keys()
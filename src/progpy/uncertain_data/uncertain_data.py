@@ -10,6 +10,22 @@ from ..visualize import plot_scatter, plot_hist
 from progpy.utils.containers import DictLikeMatrixWrapper
 
 
+def _relative_accuracy(ground_truth: dict, means: dict) -> dict:
+    """
+    Relative accuracy of the mean for each key in means, given the ground truth for that key (see UncertainData.relative_accuracy). Means can be numbers, or arrays of the means of several predictions
+
+    Raises:
+        TypeError: If ground_truth isn't a dict or container
+        ZeroDivisionError: If any ground truth value is zero
+    """
+    # if this check isn't here, goes to divide by zero check and raises AttributeError instead of TypeError. Keep? There are unittests checking for type
+    if not (isinstance(ground_truth, dict) or isinstance(ground_truth, DictLikeMatrixWrapper)):
+        raise TypeError("Ground truth must be passed as a dictionary or *.container argument.")
+    if not all(ground_truth.values()):
+        raise ZeroDivisionError("Ground truth values must be non-zero in calculating relative accuracy.")
+    return {k:1 - (abs(ground_truth[k] - v)/ground_truth[k]) for k,v in means.items()}
+
+
 class UncertainData(ABC):
     """
     Abstract base class for data with uncertainty. Any new uncertainty type must implement this class
@@ -94,12 +110,7 @@ class UncertainData(ABC):
         References:
             .. [0] Prognostics: The Science of Making Predictions (Goebel et al, 239)
         """
-        # if this check isn't here, goes to divide by zero check and raises AttributeError instead of TypeError. Keep? There are unittests checking for type
-        if not (isinstance(ground_truth, dict) or isinstance(ground_truth, DictLikeMatrixWrapper)):
-            raise TypeError("Ground truth must be passed as a dictionary or *.container argument.")
-        if not all(ground_truth.values()):
-            raise ZeroDivisionError("Ground truth values must be non-zero in calculating relative accuracy.")
-        return {k:1 - (abs(ground_truth[k] - v)/ground_truth[k]) for k,v in self.mean.items()}
+        return _relative_accuracy(ground_truth, self.mean)
 
     @abstractmethod
     def keys(self):
@@ -2,7 +2,8 @@
 
 from collections import UserList
 from collections.abc import Iterable
-from numpy import array, cov, random
+from numbers import Number
+from numpy import array, asarray, cov, einsum, float64, fromiter, integer, isnan, random
 from warnings import warn
 
 from progpy.utils.containers import DictLikeMatrixWrapper
@@ -36,16 +37,57 @@ class UnweightedSamples(UncertainData, UserList):
         else:
             raise ValueError('Invalid input. Must be list or dict, was {}'.format(type(samples)))
 
+    @classmethod
+    def _from_matrix(cls, keys: list, matrix: array, _type=dict) -> "UnweightedSamples":
+        """Create from a matrix of samples, without building a dict per sample. The dicts are only built if the list of samples (data) is accessed
+
+        Args:
+            keys (list[str]): Keys, in the order of the columns of matrix
+            matrix (np.array): Samples of shape (num_samples, len(keys))
+        """
+        samples = cls([], _type=_type)
+        samples.__matrix = matrix
+        samples.__labels = list(keys)
+        return samples
+
+    @property
+    def data(self) -> list:
+        """
+        list[dict]: Samples. If created from a matrix, the dicts are built (once) on first access
+        """
+        if self.__matrix is not None:
+            self.__data = [dict(zip(self.__labels, x)) for x in self.__matrix]
+            self.__matrix = None
+        return self.__data
+
+    @data.setter
+    def data(self, value: list) -> None:
+        self.__data = value
+        self.__matrix = None
+
+    def __len__(self) -> int:
+        if self.__matrix is not None:
+            return len(self.__matrix)
+        return len(self.data)
+
     def __eq__(self, other):
         return isinstance(other, UnweightedSamples) and self.data == other.data
 
     def __getitem__(self, n):
+        if self.__matrix is not None and isinstance(n, (int, integer)):
+            return self._type(dict(zip(self.__labels, self.__matrix[n])))
         datem = self.data[n]
         return self._type(datem) if datem is not None else None
 
     def __add__(self, other: int) -> "UncertainData":
+        if not isinstance(other, Number):
+            raise TypeError(f"unsupported operand type(s) for +: '{type(self)}' and '{type(other)}'")
         if other == 0:
             return self
+        samples, indices = self._as_matrix()
+        if samples is not None and indices is None:
+            # Every sample is numbers: other is added to all samples at once, in a matrix. Dicts are only built if the result's data is accessed
+            return UnweightedSamples._from_matrix(self.keys(), samples.T + other)
         result = []
         for i in range(len(self.data)):
             new_dict = {}
@@ -58,15 +100,25 @@ class UnweightedSamples(UncertainData, UserList):
         return self.__add__(other)
 
     def __iadd__(self, other: int) -> "UncertainData":
-        if other != 0:
+        if not isinstance(other, Number):
+            raise TypeError(f"unsupported operand type(s) for +=: '{type(self)}' and '{type(other)}'")
+        if other != 0 and self.__matrix is not None:
+            self.__matrix += other
+        elif other != 0:
             for i in range(len(self.data)):
                 for k,v in self.data[i].items():
                     self.data[i][k] += other
         return self
 
     def __sub__(self, other: int) -> "UncertainData":
+        if not isinstance(other, Number):
+            raise TypeError(f"unsupported operand type(s) for -: '{type(self)}' and '{type(other)}'")
         if other == 0:
             return self
+        samples, indices = self._as_matrix()
+        if samples is not None and indices is None:
+            # Every sample is numbers: other is subtracted from all samples at once, in a matrix. Dicts are only built if the result's data is accessed
+            return UnweightedSamples._from_matrix(self.keys(), samples.T - other)
         result = []
         for i in range(len(self.data)):
             new_dict = {}
@@ -79,7 +131,11 @@ class UnweightedSamples(UncertainData, UserList):
         return self.__sub__(other)
 
     def __isub__(self, other: int) -> "UncertainData":
-        if other != 0:
+        if not isinstance(other, Number):
+            raise TypeError(f"unsupported operand type(s) for -=: '{type(self)}' and '{type(other)}'")
+        if other != 0 and self.__matrix is not None:
+            self.__matrix -= other
+        elif other != 0:
             for i in range(len(self.data)):
                 for k,v in self.data[i].items():
                     self.data[i][k] -= other
@@ -90,10 +146,18 @@ class UnweightedSamples(UncertainData, UserList):
 
     def sample(self, num_samples: int = 1, replace: bool = True) -> "UnweightedSamples":
         # Completely random resample
-        indices = random.choice(len(self.data), int(num_samples), replace=replace)
-        return UnweightedSamples([self.data[i] for i in indices], _type=self._type)
+        if replace:
+            # Same indices as random.choice (with replacement), without its overhead
+            indices = random.randint(len(self), size=int(num_samples))
+        else:
+            indices = random.choice(len(self), int(num_samples), replace=False)
+        if self.__matrix is not None:
+            return UnweightedSamples._from_matrix(self.__labels, self.__matrix[indices], _type=self._type)
+        return UnweightedSamples(list(map(self.data.__getitem__, indices.tolist())), _type=self._type)
 
     def keys(self) -> list:
+        if self.__matrix is not None:
+            return self.__labels
         if len(self.data) == 0:
             return []  # is empty
         for sample in self:
@@ -110,11 +174,60 @@ class UnweightedSamples(UncertainData, UserList):
         Returns:
             list: list of values for given key
         """
+        if self.__matrix is not None:
+            return list(self.__matrix[:, self.__labels.index(key)])
         return [sample[key] for sample in self.data if sample is not None]
 
+    def _key_matrix(self, keys: list) -> array:
+        """Return samples for the given keys as one float array, of shape (len(keys), num_samples). If created from a matrix, the values are copied straight from it, without building a list per key
+
+        Args:
+            keys (list[str]): keys
+
+        Returns:
+            np.array: values for each key ([key][sample])
+        """
+        if self.__matrix is not None:
+            # Rows of the transposed matrix are keys. Indexing copies them into a new (C-ordered) array
+            return asarray(self.__matrix.T[[self.__labels.index(key) for key in keys]], dtype=float64)
+        return array([self.key(key) for key in keys], dtype=float64)
+
+    def _as_matrix(self) -> tuple:
+        """Samples as one float array, of shape (len(keys), num_samples) ([key][sample]), in the order of keys(). If created from a matrix, a transposed view of that matrix is returned (not a copy). Samples that are None are skipped
+
+        Returns:
+            tuple[np.array, list[int]]: Samples, and the index in data of each column (None if no samples were skipped). Samples is None if there are no samples, or if some values are None (or missing, or not numbers)
+        """
+        if self.__matrix is not None:
+            return self.__matrix.T, None
+        keys = list(self.keys())
+        data = self.data
+        indices = [i for i, datem in enumerate(data) if datem is not None]
+        if len(indices) == 0 or len(keys) == 0:
+            return None, None
+        try:
+            samples = fromiter((data[i][key] for key in keys for i in indices), dtype=float64, count=len(indices)*len(keys))  # None values become nan
+        except (KeyError, TypeError, ValueError):
+            return None, None
+        if isnan(samples).any():
+            return None, None
+        if len(indices) == len(data):
+            indices = None
+        return samples.reshape((len(keys), -1)), indices
+
     @property
     def median(self) -> dict:
         # Calculate Geometric median of all samples
+        # The sum of squared distances from sample i to all samples is N*|x_i - mean|^2 + const, so the median is the sample closest to the mean
+        samples, indices = self._as_matrix()
+        if samples is not None and samples.size > 0:
+            centered = samples - samples.mean(axis=1, keepdims=True)
+            min_index = einsum('ij,ij->j', centered, centered).argmin()
+            if indices is not None:
+                min_index = indices[min_index]
+            return self._type(self[min_index])
+
+        # Some samples have None values: each sample's distance to every other sample is calculated from its non-None values
         min_value = float('inf')
         none_flag = False
         for i, datem in enumerate(self.data):
@@ -134,6 +247,13 @@ class UnweightedSamples(UncertainData, UserList):
 
     @property
     def mean(self) -> dict:
+        samples, indices = self._as_matrix()
+        if samples is not None:
+            if indices is not None:
+                warn("Some samples were None, resulting mean is of all non-None samples. Note: in some cases, this will bias the mean result.")
+            return self._type(dict(zip(self.keys(), samples.mean(axis=1))))
+
+        # Some samples have None values: mean of each key is calculated from its non-None values
         mean = {}
         for key in self.keys():
             values = array([x[key] for x in self.data if x is not None and x[key] is not None])
@@ -144,8 +264,14 @@ class UnweightedSamples(UncertainData, UserList):
 
     @property
     def cov(self) -> dict:
-        if len(self.data) == 0:
+        if len(self) == 0:
             return [[]]
+        samples, indices = self._as_matrix()
+        if samples is not None:
+            if len(samples) < len(self):
+                warn("Some samples were None, resulting covariance is of all non-None samples. Note: in some cases, this will bias the covariance result.")
+            return cov(samples)
+
         unlabeled_samples = array([[x[key] for x in self.data if x is not None and x[key] is not None] for key in self.keys()])
         if len(unlabeled_samples) < len(self.data):
             warn("Some samples were None, resulting covariance is of all non-None samples. Note: in some cases, this will bias the covariance result.")
@@ -172,5 +298,11 @@ class UnweightedSamples(UncertainData, UserList):
             bounds = {key: bounds for key in self.keys()}
         if not isinstance(bounds, dict) or all([isinstance(b, list) and len(b) == 2 for b in bounds]):
             raise TypeError("Bounds must be list [lower, upper] or dict (key: [lower, upper]), was {}".format(type(bounds)))
-        n_elements = len(self.data)
-        return {key: sum([x is not None and x < bounds[key][1] and x > bounds[key][0] for x in self.key(key)])/n_elements for key in keys}
+        keys = list(keys)
+        n_elements = len(self)
+        # Compared for all samples of all keys at once ([key][sample]). None values are nan, so they are never in bounds
+        values = self._key_matrix(keys)
+        lower = array([[bounds[key][0]] for key in keys], dtype=float64)
+        upper = array([[bounds[key][1]] for key in keys], dtype=float64)
+        in_bounds = ((values > lower) & (values < upper)).sum(axis=1) / n_elements
+        return dict(zip(keys, in_bounds.tolist()))
@@ -16,6 +16,9 @@ class DictLikeMatrixWrapper():
         data -- dict or numpy array: The contained data (e.g., :term:`input`, :term:`state`, :term:`output`). If numpy array should be column vector in same order as keys
     """
 
+    # Row of the matrix for each key ({key: row}). Built on first key lookup, and reset (to None) when keys change. Keys should only be changed through the container's methods
+    _key_index = None
+
     def __init__(self, keys: list, data: Union[dict, np.array]):
         """ Initializes the container
         """
@@ -28,12 +31,20 @@ class DictLikeMatrixWrapper():
             if data.ndim == 1:
                 data = data[np.newaxis].T
             self._matrix = data
+        elif isinstance(data, (dict, DictLikeMatrixWrapper)) and len(keys) == 0:
+            self._matrix = np.array([], dtype=np.float64)
         elif isinstance(data, (dict, DictLikeMatrixWrapper)):
-            # ravel is used to prevent vectorized case, where data[key] returns multiple values,  from resulting in a 3D matrix
-            self._matrix = np.array(
-                [
-                    np.ravel([data[key]]) if key in data else [None] for key in keys
-                ], dtype=np.float64)
+            try:
+                # Non-vectorized case (one value per key): values are read straight into a column, without an array per key. Missing (None) values are nan
+                self._matrix = np.fromiter(
+                    (data[key] if key in data else None for key in keys),
+                    dtype=np.float64, count=len(keys)).reshape((-1, 1))
+            except (TypeError, ValueError):
+                # ravel is used to prevent vectorized case, where data[key] returns multiple values,  from resulting in a 3D matrix
+                self._matrix = np.array(
+                    [
+                        np.ravel([data[key]]) if key in data else [None] for key in keys
+                    ], dtype=np.float64)
         else:
             raise TypeError(f"Data must be a dictionary or numpy array, not {type(data)}")
 
@@ -83,7 +94,13 @@ class DictLikeMatrixWrapper():
         get all values associated with a key, ex: all values of 'i'
         """
         # Disable deprecation warnings for internal progpy code.
-        row = self._matrix[self._keys.index(key)]  # creates list from a row of matrix
+        key_index = self._key_index
+        if key_index is None:
+            key_index = self._key_index = dict(zip(self._keys, range(len(self._keys))))
+        index = key_index.get(key)
+        if index is None:
+            index = self._keys.index(key)  # Raises ValueError, as for a list
+        row = self._matrix[index]  # creates list from a row of matrix
         if len(row) == 1:  # list contains 1 value, returns that value (non-vectorized)
             return row[0]
         return row  # returns entire row/list (vectorized case)
@@ -92,7 +109,12 @@ class DictLikeMatrixWrapper():
         """
         sets a row at the key given
         """
-        index = self._keys.index(key)  # the int value index for the key given
+        key_index = self._key_index
+        if key_index is None:
+            key_index = self._key_index = dict(zip(self._keys, range(len(self._keys))))
+        index = key_index.get(key)  # the int value index for the key given
+        if index is None:
+            index = self._keys.index(key)  # Raises ValueError, as for a list
         self._matrix[index] = np.atleast_1d(value)
 
     def __delitem__(self, key: str) -> None:
@@ -101,6 +123,7 @@ class DictLikeMatrixWrapper():
         """
         self._matrix = np.delete(self._matrix, self._keys.index(key), axis=0)
         self._keys.remove(key)
+        self._key_index = None
 
     def __add__(self, other: "DictLikeMatrixWrapper") -> "DictLikeMatrixWrapper":
         """
@@ -203,6 +226,7 @@ class DictLikeMatrixWrapper():
             else:  # else it isn't it is appended to self._keys list
                 # A new key!
                 self._keys.append(key)
+                self._key_index = None
                 self._matrix = np.vstack((self._matrix, np.array([other[key]])))
 
     def __contains__(self, key: str) -> bool:
@@ -59,6 +59,11 @@ class TestDictLikeMatrixWrapper(unittest.TestCase):
         del c1['a']
         self.assertTrue((c1.matrix == np.array([[2], [5], [7]])).all())
         self.assertListEqual(c1.keys(), ['b', 'c', 'd'])
+        # Rows of remaining keys moved up
+        self.assertEqual(c1['d'], 7)
+        c1['c'] = 5
+        with self.assertRaises(ValueError):
+            c1['a']
         del c1['c']
         self.assertTrue((c1.matrix == np.array([[2], [7]])).all())
         self.assertListEqual(c1.keys(), ['b', 'd'])
@@ -72,6 +77,16 @@ class TestDictLikeMatrixWrapper(unittest.TestCase):
         c1 = DictLikeMatrixWrapper(['a', 'b'], {'a': 1, 'b': 2})
         self._checks(c1)
     
+    def test_dict_init_values(self):
+        # Missing and None values are nan
+        c1 = DictLikeMatrixWrapper(['a', 'b'], {'a': None})
+        self.assertEqual(c1._matrix.shape, (2, 1))
+        self.assertTrue(np.isnan(c1._matrix).all())
+        # Vectorized (multiple values per key)
+        c1 = DictLikeMatrixWrapper(['a', 'b'], {'a': np.array([1, 2]), 'b': np.array([3, 4])})
+        self.assertTrue(np.array_equal(c1._matrix, np.array([[1., 2.], [3., 4.]])))
+        self.assertEqual(c1._matrix.dtype, np.float64)
+
     def test_array_init(self):
         c1 = DictLikeMatrixWrapper(['a', 'b'], np.array([[1], [2]]))
         self._checks(c1)
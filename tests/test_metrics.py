@@ -508,6 +508,25 @@ class TestMetrics(unittest.TestCase):
             )
         self.assertDictEqual(profile.monotonicity(), {'a': 0.4, 'b': 0.4})
 
+    def test_toe_profile_plot_data(self):
+        profile = ToEPredictionProfile()  # Empty profile
+        covar = [[0.1, 0.01], [0.01, 0.1]]
+        for i in range(5):
+            profile.add_prediction(i, MultivariateNormalDist(['a', 'b'], [10, 20], covar))
+            profile.add_prediction(i + 0.5, ScalarData({'a': 10, 'b': 20}))
+
+        data = profile.plot({'a': 10}, render=False)
+        self.assertSetEqual(set(data.keys()), {'a', 'b'})
+        self.assertEqual(data['a']['ground_truth'], 10)
+        self.assertIsNone(data['b']['ground_truth'])
+        for key, value in data.items():
+            # 100 samples for each of the 10 predictions
+            self.assertEqual(len(value['time_of_prediction']), 1000)
+            self.assertEqual(len(value['time_to_event']), 1000)
+        # ScalarData samples are exact
+        self.assertEqual(data['a']['time_of_prediction'][100], 0.5)
+        self.assertEqual(data['a']['time_to_event'][100], 9.5)
+
 
 # This allows the module to be executed directly    
 def main():
@@ -1,7 +1,10 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration.  All Rights Reserved.
+from copy import deepcopy
+import importlib.util
 import numpy as np
 import pickle
 import sys
+import tempfile
 import unittest
 
 from progpy import PrognosticsModel
@@ -134,6 +137,15 @@ class TestPredictors(unittest.TestCase):
         self.assertTrue('impact' not in results.time_of_event.mean)
         self.assertAlmostEqual(results.times[-1], 3, 1)  # Saving every second, last time should be around the nearest 1s before falling event
 
+    def test_UTP_state_limits_after_init(self):
+        # State limits set after the predictor is created are applied
+        m = ThrownObject()
+        pred = UnscentedTransformPredictor(m)
+        m.state_limits = {'v': (0, 100)}  # Never falls
+        samples = MultivariateNormalDist(['x', 'v'], [1.83, 40], [[0.01, 0], [0, 0.01]])
+        results = pred.predict(samples, dt=0.1, events=['falling'], horizon=10)
+        self.assertTrue(np.isnan(results.time_of_event.mean['falling']))
+
     def test_UKP_Battery(self):
         def future_loading(t, x=None):
             # Variable (piece-wise) future loading scheme 
@@ -241,6 +253,63 @@ class TestPredictors(unittest.TestCase):
         self.assertTrue('impact' not in mc_results.time_of_event.mean)
         self.assertAlmostEqual(mc_results.times[-1], 3, 1)  # Saving every second, last time should be around the nearest 1s before falling event
 
+    @unittest.skipIf(importlib.util.find_spec('h5py') is None, 'h5py not installed')
+    def test_MC_h5_storage(self):
+        m = ThrownObject()
+        mc = MonteCarlo(m)
+        x0 = MultivariateNormalDist(['x', 'v'], [1.83, 40], [[0.1, 0], [0, 0.1]])
+
+        np.random.seed(42)
+        mem_results = mc.predict(x0, dt=0.2, n_samples=5, save_freq=1)
+        np.random.seed(42)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        storage_file = join(tmp_dir.name, 'mc.h5')
+        h5_results = mc.predict(x0, dt=0.2, n_samples=5, save_freq=1, storage='h5', storage_file=storage_file)
+
+        self.assertEqual(h5_results.times, mem_results.times)
+        self.assertEqual(len(h5_results.states), 5)
+        self.assertEqual(h5_results.time_of_event.mean, mem_results.time_of_event.mean)
+        for i in (0, len(mem_results.times)//2, -1):
+            h5_snapshot = h5_results.states.snapshot(i)
+            mem_snapshot = mem_results.states.snapshot(i)
+            for h5_sample, mem_sample in zip(h5_snapshot, mem_snapshot):
+                if mem_sample is None:
+                    self.assertIsNone(h5_sample)
+                else:
+                    self.assertAlmostEqual(h5_sample['x'], mem_sample['x'])
+                    self.assertAlmostEqual(h5_sample['v'], mem_sample['v'])
+            self.assertAlmostEqual(h5_results.event_states.snapshot(i).mean['impact'], mem_results.event_states.snapshot(i).mean['impact'])
+        for h5_sample, mem_sample in zip(h5_results.outputs, mem_results.outputs):
+            self.assertEqual(h5_sample.times, mem_sample.times)
+            for h5_z, mem_z in zip(h5_sample.iterrows(), mem_sample.iterrows()):
+                self.assertAlmostEqual(h5_z['x'], mem_z['x'])
+
+        # Samples are the same types as in memory
+        self.assertIsInstance(h5_results.states[0].data[0], m.StateContainer)
+        self.assertIsInstance(h5_results.outputs[0].data[0], m.OutputContainer)
+        self.assertIsInstance(h5_results.states.snapshot(0).data[0], m.StateContainer)
+
+        # Results can be pickled and copied
+        for h5_states in (pickle.loads(pickle.dumps(h5_results)).states, deepcopy(h5_results.states)):
+            self.assertEqual(h5_states.times, h5_results.times)
+            self.assertEqual(len(h5_states), 5)
+            self.assertEqual(h5_states.mean, h5_results.states.mean)
+
+        with self.assertRaises(ValueError):
+            mc.predict(x0, dt=0.2, n_samples=5, storage='invalid')
+        with self.assertRaises(ValueError):
+            mc.predict(x0, dt=0.2, n_samples=5, storage='h5')  # Missing storage_file
+
+        # File is closed when a sample fails
+        def future_loading(t, x=None):
+            raise RuntimeError('Loading failed')
+        with self.assertRaises(RuntimeError):
+            mc.predict(x0, future_loading, dt=0.2, n_samples=5, storage='h5', storage_file=storage_file)
+        import h5py
+        with h5py.File(storage_file, 'w'):
+            pass  # Would fail if the file was still open
+
     def test_prediction_mvnormaldist(self):
         times = list(range(10))
         covar = [[0.1, 0.01], [0.01, 0.1]]
@@ -313,6 +382,25 @@ class TestPredictors(unittest.TestCase):
             tmp = profile[0.5]
             # 0.5 doesn't exist anymore
 
+        # Other ways of adding and removing predictions keep keys in order
+        profile.update({0.25: ScalarData({'a': 1.025, 'b': 2.05, 'c': -3.175})})
+        self.assertEqual(profile.setdefault(0.5, ScalarData({'a': 1.05, 'b': 2.1, 'c': -3.15})), ScalarData({'a': 1.05, 'b': 2.1, 'c': -3.15}))
+        self.assertEqual(profile.setdefault(0.5), ScalarData({'a': 1.05, 'b': 2.1, 'c': -3.15}))
+        self.assertEqual(profile.pop(0), ScalarData({'a': 1, 'b': 2, 'c': -3.2}))
+        self.assertIsNone(profile.pop(0, None))
+        profile |= {0: ScalarData({'a': 1, 'b': 2, 'c': -3.2})}
+        self.assertEqual(profile.keys(), [0, 0.25, 0.5, 0.75, 1])
+        self.assertEqual(list(profile), [0, 0.25, 0.5, 0.75, 1])
+        self.assertEqual(len(profile), 5)
+
+        joined = profile | {0.1: ScalarData({'a': 1.01, 'b': 2.02, 'c': -3.19})}
+        self.assertIsInstance(joined, ToEPredictionProfile)
+        self.assertEqual(joined.keys(), [0, 0.1, 0.25, 0.5, 0.75, 1])
+        joined = {0.1: ScalarData({'a': 1.01, 'b': 2.02, 'c': -3.19})} | profile
+        self.assertIsInstance(joined, ToEPredictionProfile)
+        self.assertEqual(joined.keys(), [0, 0.1, 0.25, 0.5, 0.75, 1])
+        self.assertEqual(len(profile), 5)  # Not changed
+
     def test_pickle_UTP_ThrownObject_pickle_result(self): # PREDICTION TEST
         m = ThrownObject()
         pred = UnscentedTransformPredictor(m)
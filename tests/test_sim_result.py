@@ -67,6 +67,15 @@ class TestSimResult(unittest.TestCase):
         result_df = result_df.set_index('time')
         self.assertTrue(result.frame.equals(result_df))
 
+        # Frame is updated when a data point is replaced
+        time = [i * 0.5 for i in range(5)]
+        result = SimResult(time, state)
+        result.frame
+        result[2] = {'a': -1.0, 'b': -2.0}
+        self.assertEqual(result.frame.loc[1.0, 'a'], -1)
+        self.assertEqual(result.frame.loc[1.0, 'b'], -2)
+        self.assertEqual(result.frame.loc[2.0, 'a'], 10)
+
     def test_iloc(self):
         # Variables
         time = list(range(5))  # list of int from 0 to 4
@@ -272,6 +281,37 @@ class TestSimResult(unittest.TestCase):
         self.assertEqual(result.dtype, np.dtype('float64'))
         self.assertTrue(np.all(result == np.array([[i * 2.5, i * 5] for i in range(10)])))
 
+        # Stacked values are updated when the SimResult is modified
+        result = SimResult(time, state)
+        result.to_numpy()[0, 0] = -1  # Modifying returned array shouldn't change the SimResult
+        self.assertEqual(result.to_numpy()[0, 0], 0)
+        result.pop_by_index()
+        self.assertEqual(result.to_numpy().shape, (9, 2))
+        result.extend(SimResult([10], [DictLikeMatrixWrapper(['a', 'b'], {'a': 25, 'b': 50})]))
+        self.assertEqual(result.to_numpy().shape, (10, 2))
+        self.assertTrue(np.all(result.to_numpy()[-1] == [25, 50]))
+        result.clear()
+        self.assertEqual(result.to_numpy().shape, (1, 0))
+
+        # Stacked values follow changes to the data and containers in place
+        result = SimResult(time, state)
+        result.to_numpy()
+        result.data[0]['a'] = -1
+        result.data[1] = DictLikeMatrixWrapper(['a', 'b'], {'a': -2, 'b': -4})
+        self.assertTrue(np.all(result.to_numpy()[:2] == [[-1, 0], [-2, -4]]))
+        result = LazySimResult(lambda x: x.copy(), time, state)
+        result.to_numpy()
+        result.data[0]['a'] = -1
+        result.data[1] = DictLikeMatrixWrapper(['a', 'b'], {'a': -2, 'b': -4})
+        self.assertTrue(np.all(result.to_numpy()[:2] == [[-1, 0], [-2, -4]]))
+
+        # Equality of container data
+        result = SimResult(time, state)
+        self.assertTrue(result.equals(SimResult(time, state)))
+        self.assertFalse(result.equals(SimResult(time, state[:-1] + [state[0]])))
+        self.assertFalse(result.equals(SimResult(time, [DictLikeMatrixWrapper(['a', 'c'], x._matrix) for x in state])))
+        self.assertFalse(result.equals(SimResult(list(range(1, 11)), state)))
+
     def test_remove(self):
         # Variables
         time = list(range(5))  # list of int, 0 to 4
@@ -325,6 +365,24 @@ class TestSimResult(unittest.TestCase):
         self.assertRaises(ValueError, result.remove, [0, 1])
         self.assertRaises(ValueError, result.remove, {})
         self.assertRaises(ValueError, result.remove, set())
+        self.assertRaises(ValueError, result.remove, t=3)  # Nonexistent time
+
+        # Unsorted and repeated times
+        result = SimResult([2, 0, 1, 1], [{'a': i} for i in range(4)])
+        result.remove(t=1)
+        self.assertEqual(result.times, [2, 0, 1])
+        self.assertEqual(result.data, [{'a': 0}, {'a': 1}, {'a': 3}])
+        result = SimResult([0, 1, 1, 2], [{'a': i} for i in range(4)])
+        result.remove(t=1)
+        self.assertEqual(result.times, [0, 1, 2])
+        self.assertEqual(result.data, [{'a': 0}, {'a': 2}, {'a': 3}])
+
+        # Times modified in place
+        result.remove(t=0)
+        result.times[0] = 5
+        result.remove(t=5)
+        self.assertEqual(result.times, [2])
+        self.assertEqual(result.data, [{'a': 3}])
 
     def test_clear(self):
         # Variables
@@ -340,12 +398,13 @@ class TestSimResult(unittest.TestCase):
         self.assertEqual(result.times, time)
         self.assertTrue(result.frame.equals(result_df))
         self.assertEqual(result.data, state)
+        self.assertFalse(result.frame_is_empty())
         self.assertRaises(TypeError, result.clear, True)
 
         result.clear()
         self.assertEqual(result.times, [])
         self.assertEqual(result.data, [])
-        self.assertTrue(result.frame_is_empty)
+        self.assertTrue(result.frame_is_empty())
 
     def test_get_time(self):
         # Variables
@@ -472,9 +531,23 @@ class TestSimResult(unittest.TestCase):
         result = LazySimResult(f, time, state)
 
         self.assertFalse(result.is_cached())
+        self.assertFalse(result.frame_is_empty())
+        self.assertFalse(result.is_cached())  # Checking for an empty frame doesn't calculate data
         self.assertEqual(result.data, state2)
         self.assertTrue(result.is_cached())
 
+        # Containers
+        def f_container(x):
+            return DictLikeMatrixWrapper(['a', 'b'], {k: v * 2 for k, v in x.items()})
+
+        result = LazySimResult(f_container, time, state)
+        self.assertEqual(result.data, [DictLikeMatrixWrapper(['a', 'b'], x) for x in state2])
+        self.assertTrue(np.all(result.to_numpy() == np.array([[x['a'], x['b']] for x in state2])))
+        result.data[1]['a'] = -1  # Modifying one data point doesn't change the others
+        self.assertEqual(result.data[1]['a'], -1)
+        self.assertEqual(result.data[0], DictLikeMatrixWrapper(['a', 'b'], state2[0]))
+        self.assertEqual(result.data[2], DictLikeMatrixWrapper(['a', 'b'], state2[2]))
+
     def test_lazy_clear(self):
         def f(x):
             return {k: v * 2 for k, v in x.items()}
@@ -789,6 +862,11 @@ class TestSimResult(unittest.TestCase):
         result = SimResult(time, states)
         self.assertDictEqual(result.monotonicity(), {'a': 0.0, 'b': 0.0})
 
+        # Test data points with different keys
+        states = [{'a': 1 + i / 10, 'b': 2 - i / 5} for i in range(4)] + [{'a': 2}]
+        result = SimResult(time, states)
+        self.assertDictEqual(result.monotonicity(), {'a': 1.0, 'b': 1.0})
+
 
 # This allows the module to be executed directly
 def main():
@@ -1,4 +1,6 @@
 # Copyright © 2021 United States Government as represented by the Administrator of the National Aeronautics and Space Administration.  All Rights Reserved.
+from copy import deepcopy
+import gc
 from os.path import dirname, join
 import numpy as np
 import random
@@ -615,6 +617,50 @@ class TestStateEstimators(unittest.TestCase):
             self.assertEqual(filt.particles[key][0], x0[key])
             self.assertEqual(filt.particles[key][1], x0[key])
 
+    def test_PF_systematic_resample(self):
+        from filterpy.monte_carlo import systematic_resample as filterpy_systematic_resample
+        from progpy.state_estimators.particle_filter import systematic_resample
+
+        for weights in (np.full(10, 0.1), np.array([0.5, 0, 0.25, 0.25, 0]), np.random.dirichlet(np.ones(1000))):
+            np.random.seed(7)
+            expected = filterpy_systematic_resample(weights)
+            np.random.seed(7)
+            self.assertTrue(np.array_equal(systematic_resample(weights), expected))
+
+    def test_PF_n_jobs(self):
+        m = ThrownObject(process_noise=0)
+        m.is_vectorized = False  # n_jobs only applies to non-vectorized models
+
+        # Without process noise every particle follows the same trajectory, so result does not depend on how the particles are split
+        filt = ParticleFilter(m, {'x': 1.83, 'v': 40}, num_particles=10, measurement_noise={'x': 1})
+        filt.estimate(0.5, {}, {'x': 20.6}, dt=0.1)
+        filt_parallel = ParticleFilter(m, {'x': 1.83, 'v': 40}, num_particles=10, measurement_noise={'x': 1}, n_jobs=2)
+        filt_parallel.estimate(0.5, {}, {'x': 20.6}, dt=0.1)
+        self.assertEqual(filt_parallel.t, 0.5)
+        self.assertTrue(np.array_equal(filt_parallel.particles._matrix, filt.particles._matrix))
+        self.assertTrue(np.array_equal(filt_parallel.weights, filt.weights))
+
+        # Worker processes are reused between estimates, and started again after close
+        filt.estimate(1, {}, {'x': 38.2}, dt=0.1)
+        filt_parallel.estimate(1, {}, {'x': 38.2}, dt=0.1)
+        filt_parallel.close()
+        filt.estimate(1.5, {}, {'x': 53.4}, dt=0.1)
+        filt_parallel.estimate(1.5, {}, {'x': 53.4}, dt=0.1)
+        self.assertTrue(np.array_equal(filt_parallel.particles._matrix, filt.particles._matrix))
+        self.assertTrue(np.array_equal(filt_parallel.weights, filt.weights))
+
+        # Filter can be copied, without its worker processes
+        filt_copy = deepcopy(filt_parallel)
+        self.assertTrue(np.array_equal(filt_copy.particles._matrix, filt_parallel.particles._matrix))
+
+        # Worker processes are shut down when the filter is garbage collected
+        filt_parallel.estimate(2, {}, {'x': 66.2}, dt=0.1)
+        finalizer = filt_parallel._ParticleFilter__executor[3]
+        self.assertTrue(finalizer.alive)
+        del filt_parallel
+        gc.collect()
+        self.assertFalse(finalizer.alive)
+
 # This allows the module to be executed directly    
 def main():
      # This ensures that the directory containing StateEstimatorTemplate is in the python search directory
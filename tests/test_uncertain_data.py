@@ -2,7 +2,7 @@
 
 import unittest
 from progpy.uncertain_data import UnweightedSamples, MultivariateNormalDist, ScalarData
-from numpy import array
+from numpy import allclose, array
 
 
 class TestUncertainData(unittest.TestCase):
@@ -43,6 +43,10 @@ class TestUncertainData(unittest.TestCase):
         data = [{'a': 1, 'b': 2}, {'a': 3, 'b': 4}, {'a': 1, 'b': 4}, {'a': 2, 'b': 3}, {'a': 3, 'b': 1}]
         data = UnweightedSamples(data)
         self.assertEqual(data.median, {'a': 2, 'b': 3})
+        # None samples are skipped. None values use each sample's non-None values
+        self.assertEqual(UnweightedSamples([None] + data.data).median, {'a': 2, 'b': 3})
+        with self.assertWarns(UserWarning):
+            self.assertEqual(UnweightedSamples([{'a': 1, 'b': None}, {'a': 2, 'b': 3}, {'a': 5, 'b': 3}]).median, {'a': 2, 'b': 3})
 
         # Test percentage in bounds
         self.assertEqual(data.percentage_in_bounds([0, 2.5]), 
@@ -60,11 +64,44 @@ class TestUncertainData(unittest.TestCase):
         dist = MultivariateNormalDist(['a', 'b'], array([2, 10]), array([[1, 0], [0, 1]]))
         self.assertDictEqual(dist.mean, {'a': 2, 'b':10})
         self.assertDictEqual(dist.median, {'a': 2, 'b':10})
+        self.assertListEqual(dist.mean_array.tolist(), [2, 10])
         self.assertEqual(dist.sample().size, 1)
         self.assertEqual(dist.sample(10).size, 10)
         self.assertTrue((dist.cov == array([[1, 0], [0, 1]])).all())
         dist.percentage_in_bounds([0, 10])
 
+        # Samples
+        samples = dist.sample(10)
+        self.assertEqual(len(samples), 10)
+        self.assertListEqual(samples.keys(), ['a', 'b'])
+        values = samples.key('b')
+        self.assertEqual(len(values), 10)
+        self.assertDictEqual(samples[3], {'a': samples.key('a')[3], 'b': values[3]})
+        self.assertListEqual(samples._key_matrix(['b', 'a']).tolist(), [values, samples.key('a')])
+        self.assertEqual(len(samples.sample(5)), 5)
+        self.assertListEqual(samples.data, [{'a': a, 'b': b} for a, b in zip(samples.key('a'), values)])
+        samples += 1
+        self.assertListEqual(samples.key('b'), [b + 1 for b in values])
+
+        # Statistics calculated from the sample matrix match those calculated from the samples as dicts
+        samples = dist.sample(50)
+        mean, median, covar = samples.mean, samples.median, samples.cov
+        samples = UnweightedSamples(samples.data)
+        for key in ['a', 'b']:
+            self.assertAlmostEqual(mean[key], samples.mean[key])
+        self.assertDictEqual(median, samples.median)
+        self.assertTrue(allclose(covar, samples.cov))
+
+        # Samples match numpy's multivariate_normal for the same seed, including repeated sampling
+        from numpy.random import multivariate_normal, seed
+        cov = array([[2, 0.5], [0.5, 1]])
+        dist = MultivariateNormalDist(['a', 'b'], array([2, 10]), cov)
+        seed(1)
+        expected = [multivariate_normal([2, 10], cov, 5) for _ in range(2)]
+        seed(1)
+        for e in expected:
+            self.assertTrue((dist._sample_array(5) == e).all())
+
     def test_scalardist(self):
         data = {'a': 12, 'b': 14}
         d = ScalarData(data)
@@ -74,6 +111,8 @@ class TestUncertainData(unittest.TestCase):
         self.assertEqual(d.percentage_in_bounds([13, 20]), {'a': 0, 'b': 1})
         self.assertEqual(d.percentage_in_bounds([0, 10]), {'a': 0, 'b': 0})
         self.assertEqual(d.percentage_in_bounds([0, 20]), {'a': 1, 'b': 1})
+        self.assertEqual(d.cov.shape, (2, 2))
+        self.assertTrue((d.cov == 0).all())
 
     def test_pickle_unweightedsamples(self):
         data = {'a': 12, 'b': 14}
@@ -361,6 +400,19 @@ class TestUncertainData(unittest.TestCase):
         s -= 5.5
         self.assertEqual(s.data, [{'a': -4.5, 'b': -3.5}, {'a': -2.5, 'b': -7.5}])
 
+    def test_unweightedsamples_matrix_arithmetic(self):
+        # Samples backed by a matrix (e.g., from MultivariateNormalDist.sample) stay backed by a matrix
+        s = UnweightedSamples._from_matrix(['a', 'b'], array([[1.0, 2.0], [3.0, -2.0]]))
+        self.assertEqual((s + 5).data, [{'a': 6, 'b': 7}, {'a': 8, 'b': 3}])
+        self.assertEqual((s - 5).data, [{'a': -4, 'b': -3}, {'a': -2, 'b': -7}])
+        self.assertEqual(s.key('a'), [1, 3])  # Not modified
+        s += 5
+        self.assertEqual(s.key('b'), [7, 3])
+        s -= 10
+        self.assertEqual(s.data, [{'a': -4, 'b': -3}, {'a': -2, 'b': -7}])
+        with self.assertRaises(TypeError):
+            s + []
+
     def test_MultivariateNormalDist_add_override(self):
         dist = MultivariateNormalDist(['a', 'b'], array([2, 10]), array([[1, 0], [0, 1]]))
         